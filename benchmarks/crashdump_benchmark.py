@@ -0,0 +1,65 @@
+"""
+Benchmark writing crashdumps when every record in a batch fails in the same
+way, comparing formatting every traceback in full against deduplicating
+crashdumps by fingerprint
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/crashdump_benchmark.py
+"""
+import sys
+import time
+
+from spine_aws_common.logger import Logger
+
+RECORDS = 1000
+
+
+class CountingSink:
+    """Count the characters written so only the logger is measured"""
+
+    formats_exceptions = False
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, log_line, log_type):
+        """Count the line"""
+        # pylint:disable=unused-argument
+        self.written += len(log_line) + 1
+
+    def flush(self):
+        """Nothing to flush"""
+
+
+def _call_downstream(depth):
+    """Fail a few frames down, as a failing client call would"""
+    if depth:
+        _call_downstream(depth - 1)
+    raise ConnectionError("Downstream unavailable")
+
+
+def _run(deduplicate_crashdumps):
+    """Log a crashdump for every record, returning the elapsed seconds and characters written"""
+    log_sink = CountingSink()
+    logger = Logger(process_name="benchmark", log_sink=log_sink, deduplicate_crashdumps=deduplicate_crashdumps)
+    start = time.perf_counter()
+    for _ in range(RECORDS):
+        try:
+            _call_downstream(10)
+        except ConnectionError as err:
+            logger.write_log("LAMBDA9999", sys.exc_info(), {"error": str(err)})
+    return time.perf_counter() - start, log_sink.written
+
+
+def main():
+    """Run the benchmark"""
+    full, full_written = min(_run(False) for _ in range(3))
+    deduplicated, deduplicated_written = min(_run(True) for _ in range(3))
+    print(
+        f"{RECORDS} identical crashdumps: full {full * 1000:.1f}ms {full_written} chars, "
+        f"deduplicated {deduplicated * 1000:.1f}ms {deduplicated_written} chars, speedup {full / deduplicated:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
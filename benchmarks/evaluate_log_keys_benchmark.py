@@ -0,0 +1,77 @@
+"""
+Benchmark the per-line cost of classifying log keys for PID, comparing a
+LogLineProcessor built per key against the shared classifier
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/evaluate_log_keys_benchmark.py
+"""
+import timeit
+
+import six
+
+from spine_aws_common.log.formatting import NOT_PROVIDED, evaluate_log_keys
+from spine_aws_common.log.loglineprocessor import LogLineProcessor
+
+ITERATIONS = 50000
+
+# Typical parameters logged while handling an API Gateway request
+API_GATEWAY_LOG_ROWS = {
+    "request": {
+        "internalID": "20230101120000000000_ABCDEF",
+        "sessionid": "",
+        "httpMethod": "GET",
+        "requestUrl": "https://api.example.nhs.uk/patient/search?family=smith&gender=female&birthdate=1970",
+        "sourceIp": "10.0.0.1",
+        "userAgent": "python-requests/2.28.2",
+    },
+    "response": {
+        "internalID": "20230101120000000000_ABCDEF",
+        "sessionid": "",
+        "url": "https://api.example.nhs.uk/patient/search?family=smith&gender=female&birthdate=1970",
+        "statusCode": 200,
+        "duration": 0.123,
+        "parameters": {"family": "smith", "gender": "female", "count": 10},
+    },
+    "audit": {
+        "internalID": "20230101120000000000_ABCDEF",
+        "sessionid": "",
+        "requestUrl": "https://api.example.nhs.uk/patient?nhsNumber=9999999999",
+        "statusCode": 200,
+    },
+}
+
+
+def _per_key_processor(log_row_dict):
+    """Classify keys building a new LogLineProcessor per key, as previously done"""
+
+    def check_for_param_dictionary(param_dict):
+        if isinstance(param_dict, dict):
+            for param_key in param_dict:
+                if LogLineProcessor().process(param_key, param_dict[param_key]):
+                    return True
+        return False
+
+    audit_log_required = False
+    for log_key in log_row_dict:
+        audit = check_for_param_dictionary(log_row_dict[log_key])
+        audit_log_required = audit or audit_log_required
+        audit = LogLineProcessor().process(log_key, log_row_dict[log_key])
+        audit_log_required = audit or audit_log_required
+        value = log_row_dict[log_key]
+        if isinstance(value, six.string_types) and not value.strip():
+            log_row_dict[log_key] = NOT_PROVIDED
+    return audit_log_required
+
+
+def main():
+    """Run the benchmark"""
+    print(f"{'log':>8} {'before (us)':>12} {'after (us)':>11} {'speedup':>8}")
+    for name, log_row_dict in API_GATEWAY_LOG_ROWS.items():
+        assert _per_key_processor(dict(log_row_dict)) == evaluate_log_keys(dict(log_row_dict))
+        before = min(timeit.repeat(lambda: _per_key_processor(dict(log_row_dict)), number=ITERATIONS, repeat=3))
+        after = min(timeit.repeat(lambda: evaluate_log_keys(dict(log_row_dict)), number=ITERATIONS, repeat=3))
+        print(f"{name:>8} {before / ITERATIONS * 1e6:>12.2f} {after / ITERATIONS * 1e6:>11.2f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark writing log lines to per-channel files, comparing the standard
+Python logging setup of a FileHandler per channel selected by filters against
+the HourlyFileSink. Reports the share of one CPU needed to sustain 50k lines/s.
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/file_sink_benchmark.py
+"""
+import logging
+import os
+import tempfile
+import time
+
+from spine_aws_common.log.constants import LoggingConstants
+from spine_aws_common.log.sinks import HourlyFileSink
+from spine_aws_common.log.spinelogging import (
+    AuditFilter,
+    CrashFilter,
+    MonitorFilter,
+    OperationsFilter,
+    SpineLogFormatter,
+    SpineLogger,
+)
+
+RATE = 50000
+LINES = 5 * RATE
+
+LINE = (
+    "Log_Level=INFO Process=worker internalID=20230101120000000000_ABCDEF logReference=MESHSEND0005 - "
+    'Message sent mailbox="X26HC001" message_id="20230101120000000000_ABCDEF" size=10240'
+)
+
+# Most lines are operations, with some audit and monitor
+LOG_TYPES = [LoggingConstants.LFR_OPERATIONS] * 8 + [LoggingConstants.LFR_AUDIT, LoggingConstants.LFR_NMS]
+
+
+def _file_handler_logger(log_directory):
+    """The Spine logger with a FileHandler per channel, as set up for workers"""
+    logger = SpineLogger("benchmark")
+    logger.propagate = False
+    formatter = SpineLogFormatter("%(asctime)s %(message)s")
+    for log_type, log_filter in (
+        (LoggingConstants.LFR_OPERATIONS, OperationsFilter()),
+        (LoggingConstants.LFR_AUDIT, AuditFilter()),
+        (LoggingConstants.LFR_NMS, MonitorFilter()),
+        (LoggingConstants.LFR_CRASHDUMP, CrashFilter()),
+    ):
+        handler = logging.FileHandler(os.path.join(log_directory, log_type + LoggingConstants.LOG_SUFFIX))
+        handler.addFilter(log_filter)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+def _run_file_handler(log_directory):
+    """Write LINES lines through the FileHandlers, returning the CPU seconds"""
+    logger = _file_handler_logger(log_directory)
+    logging_functions = {
+        LoggingConstants.LFR_OPERATIONS: logger.info,
+        LoggingConstants.LFR_AUDIT: logger.audit,
+        LoggingConstants.LFR_NMS: logger.monitor,
+    }
+    start = time.process_time()
+    for line in range(LINES):
+        logging_functions[LOG_TYPES[line % len(LOG_TYPES)]](LINE)
+    for handler in logger.handlers:
+        handler.close()
+    return time.process_time() - start
+
+
+def _run_hourly_file_sink(log_directory):
+    """Write LINES lines through the HourlyFileSink, returning the CPU seconds"""
+    log_sink = HourlyFileSink(log_directory)
+    timestamp = "01/01/2023 12:00:00.000 "
+    start = time.process_time()
+    for line in range(LINES):
+        log_sink.write(timestamp + LINE, LOG_TYPES[line % len(LOG_TYPES)])
+    log_sink.close()
+    return time.process_time() - start
+
+
+def main():
+    """Run the benchmark"""
+    for name, run in (("logging.FileHandler", _run_file_handler), ("HourlyFileSink", _run_hourly_file_sink)):
+        with tempfile.TemporaryDirectory() as log_directory:
+            elapsed = run(log_directory)
+        print(
+            f"{name}: {LINES} lines in {elapsed * 1000:.0f}ms CPU, {LINES / elapsed:.0f} lines/s, "
+            f"{RATE * elapsed / LINES * 100:.1f}% of a CPU at {RATE} lines/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
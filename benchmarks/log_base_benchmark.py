@@ -0,0 +1,76 @@
+"""
+Benchmark the cold start cost of loading a log base with thousands of
+references, comparing parsing the cfg file and building every entry up front
+against loading the compiled log base and building entries on first use
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/log_base_benchmark.py
+"""
+import os
+import tempfile
+import time
+
+from spine_aws_common.log.compiledlogbase import compile_log_base, load_compiled_log_base
+from spine_aws_common.log.details import LogCatalog, create_log_details
+from spine_aws_common.log.spinelogging import parse_log_base_config
+
+SIZES = [100, 1000, 5000]
+
+# References used by a typical invocation
+USED_REFERENCES = 20
+
+
+def _write_log_base(path, references):
+    """Write a log base with the given number of references"""
+    with open(path, "w", encoding="utf-8") as log_base_file:
+        log_base_file.write("[UTI9999]\nLog Level = INFO\nLog Text = Default\n\n")
+        for reference in range(references):
+            log_base_file.write(
+                f"[BENCH{reference:05d}]\nLog Level = INFO\n"
+                f"Log Text = Processed record={{record}} of type={{record_type}} in duration={{duration}}\n\n"
+            )
+
+
+def _cfg_cold_start(path):
+    """Parse the cfg and build every entry, as every cold start previously did"""
+    log_base_dict = parse_log_base_config(path)
+    entries = {reference: create_log_details(entry[0], entry[1]) for reference, entry in log_base_dict.items()}
+    for reference in range(USED_REFERENCES):
+        entries.get(f"BENCH{reference:05d}")
+
+
+def _compiled_cold_start(path):
+    """Load the compiled log base, building only the entries used"""
+    catalog = LogCatalog(load_compiled_log_base(path))
+    for reference in range(USED_REFERENCES):
+        catalog.get(f"BENCH{reference:05d}")
+
+
+def _best_of(function, path, repeat=5):
+    """Best elapsed seconds of repeated runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    """Run the benchmark"""
+    with tempfile.TemporaryDirectory() as directory:
+        for references in SIZES:
+            path = os.path.join(directory, f"logbase{references}.cfg")
+            _write_log_base(path, references)
+            compile_log_base(path)
+
+            cfg = _best_of(_cfg_cold_start, path)
+            compiled = _best_of(_compiled_cold_start, path)
+            print(
+                f"{references} references: cfg {cfg * 1000:.2f}ms, compiled {compiled * 1000:.2f}ms, "
+                f"speedup {cfg / compiled:.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark PID masking of large adversarial messages, comparing the previous
+backtracking regular expressions against the linear masking functions
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/masking_benchmark.py
+"""
+import time
+
+from spine_aws_common.log.masking import (
+    GP_PROVIDER_PATTERN,
+    NHS_NUMBER_PATTERN,
+    TICKET_PATTERN,
+    URL_PID_RE_COMPILED,
+    URL_PID_REPL,
+    mask_pid,
+)
+
+SIZES = {"1KB": 1024, "100KB": 100 * 1024, "5MB": 5 * 1024 * 1024}
+
+# The regular expressions are quadratic on some inputs, so are not run
+# beyond this size
+LEGACY_SIZE_LIMIT = 100 * 1024
+
+# Repeated to build messages which cause the most backtracking
+ADVERSARIAL_UNITS = {
+    "fhir": "fhir.nhs.uk/Id/nhs-number%7Cunknown ",
+    "ticket": "/ticket /ticket?",
+    "gpprovider": "'GPPROVIDER_" + "a" * 48 + " ",
+    "multiline": "Tornado request headers\n'GPPROVIDER_abc' fhir.nhs.uk/Id/nhs-number%7C9999999999\n?nhsNumber=1&",
+}
+
+
+def _legacy_mask_pid(val):
+    """Mask PID with the sequence of backtracking regular expressions"""
+    match = TICKET_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "/ticket ___TICKET_MASKED___ " + match.group(3)
+    match = GP_PROVIDER_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "'GPPROVIDER___MASKED___'" + match.group(2)
+    match = NHS_NUMBER_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "nhs-number%7C___MASKED___" + match.group(2)
+    return URL_PID_RE_COMPILED.sub(URL_PID_REPL, val)
+
+
+def _time(function, val):
+    """Best of three timings in milliseconds"""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        result = function(val)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+
+def main():
+    """Run the benchmark"""
+    print(f"{'input':>10} {'size':>6} {'regex (ms)':>12} {'linear (ms)':>12}")
+    for name, unit in ADVERSARIAL_UNITS.items():
+        for size_name, size in SIZES.items():
+            val = (unit * (size // len(unit) + 1))[:size]
+            linear_ms, linear_result = _time(mask_pid, val)
+            if size <= LEGACY_SIZE_LIMIT:
+                legacy_ms, legacy_result = _time(_legacy_mask_pid, val)
+                assert legacy_result == linear_result
+                legacy_text = f"{legacy_ms:>12.3f}"
+            else:
+                legacy_text = f"{'skipped':>12}"
+            print(f"{name:>10} {size_name:>6} {legacy_text} {linear_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark creating the log preamble for a 100k line run, comparing formatting
+every preamble in full against the cached timestamp and prefix
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/preamble_benchmark.py
+"""
+import datetime
+import time
+
+from spine_aws_common.logger import Logger
+
+LINES = 100000
+REFERENCES = [("INFO", "LAMBDA0002"), ("INFO", "MESHSEND0005"), ("WARN", "UTI9996"), ("INFO", "MESHSEND0007")]
+
+
+def _full_preamble(logger, time_now, log_level, process_name, log_reference, internal_id):
+    """Create the preamble in full, as every line previously did"""
+    # pylint:disable=too-many-arguments
+    log_timestamp_string = time_now.strftime(logger.date_format) + "."
+    log_timestamp_string += str(int(time_now.microsecond / 1000)).rjust(3, "0")
+
+    log_preamble = log_timestamp_string + " Log_Level=" + log_level
+    log_preamble = log_preamble + " Process=" + str(process_name)
+    if internal_id:
+        log_preamble = log_preamble + " internalID=" + internal_id
+    return log_preamble + " logReference=" + str(log_reference)
+
+
+def _run(create_preamble, logger):
+    """Create LINES preambles, returning the elapsed seconds"""
+    start = time.perf_counter()
+    for line in range(LINES):
+        log_level, log_reference = REFERENCES[line % len(REFERENCES)]
+        create_preamble(
+            logger, datetime.datetime.now(), log_level, logger.process_name, log_reference, logger.internal_id
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark"""
+    logger = Logger(process_name="benchmark", internal_id="20230101120000000000_ABCDEF")
+    time_now = datetime.datetime.now()
+    for log_level, log_reference in REFERENCES:
+        args = (time_now, log_level, "benchmark", log_reference, logger.internal_id)
+        assert _full_preamble(logger, *args) == logger._create_log_preamble(*args)  # pylint:disable=W0212
+
+    full = min(_run(_full_preamble, logger) for _ in range(3))
+    cached = min(_run(Logger._create_log_preamble, logger) for _ in range(3))  # pylint:disable=W0212
+    print(f"{LINES} lines: full {full * 1000:.1f}ms, cached {cached * 1000:.1f}ms, speedup {full / cached:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark rendering log lines with pre-parsed LogTemplates against the
+previous create_log_line, which formatted the raw log text and replaced
+newlines with a regular expression
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/template_benchmark.py
+"""
+import re
+import timeit
+
+from spine_aws_common.log.formatting import LogTemplate, create_log_line
+
+PREAMBLE = "01/01/2023 12:00:00.000 Log_Level=INFO Process=benchmark internalID=abc logReference=BENCH001"
+ITERATIONS = 50000
+
+
+def _legacy_create_log_line(log_preamble, log_text, substitution_dict):
+    """The previous create_log_line, without its substitution failure handling"""
+    try:
+        log_line = log_preamble + " - " + log_text.format(**substitution_dict)
+    except KeyError as err:
+        log_line = log_preamble + " - " + log_text + " - " + str(list(err.args))
+
+    # Replace newlines with spaces
+    log_line = re.sub(r"\n|\r", " ", log_line)
+    return log_line
+
+
+def _template(field_count):
+    """Log text and substitutions with the given number of fields"""
+    log_text = " ".join(f"field{index}='{{field{index}}}'" for index in range(field_count))
+    substitution_dict = {f"field{index}": f"value {index}" for index in range(field_count)}
+    return log_text, substitution_dict
+
+
+def main():
+    """Run the benchmark"""
+    print(f"{'fields':>6} {'previous (us)':>16} {'LogTemplate (us)':>17} {'speedup':>8}")
+    for field_count in (1, 10, 50):
+        log_text, substitution_dict = _template(field_count)
+        log_template = LogTemplate(log_text)
+        assert _legacy_create_log_line(PREAMBLE, log_text, substitution_dict) == create_log_line(
+            PREAMBLE, log_template, substitution_dict
+        )
+
+        raw = min(
+            timeit.repeat(
+                lambda: _legacy_create_log_line(PREAMBLE, log_text, substitution_dict), number=ITERATIONS, repeat=3
+            )
+        )
+        compiled = min(
+            timeit.repeat(
+                lambda: create_log_line(PREAMBLE, log_template, substitution_dict), number=ITERATIONS, repeat=3
+            )
+        )
+        print(
+            f"{field_count:>6} {raw / ITERATIONS * 1e6:>16.2f} {compiled / ITERATIONS * 1e6:>17.2f} "
+            f"{raw / compiled:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
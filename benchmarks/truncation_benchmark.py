@@ -0,0 +1,56 @@
+"""
+Benchmark writing a log line with a whole request body as a substitution,
+comparing masking and rendering the full value against capping it first
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/truncation_benchmark.py
+"""
+import time
+
+from spine_aws_common.logger import Logger
+
+LINES = 100
+
+# A 2MB request body, with NHS numbers in it for masking to find
+BODY = '{"entry": [' + ('{"resource": {"identifier": "9999999999", "text": "' + "x" * 1000 + '"}},') * 2000 + "]}"
+
+
+class CountingSink:
+    """Count the characters written so only the logger is measured"""
+
+    formats_exceptions = False
+
+    def __init__(self):
+        self.written = 0
+
+    def write(self, log_line, log_type):
+        """Count the line"""
+        # pylint:disable=unused-argument
+        self.written += len(log_line) + 1
+
+    def flush(self):
+        """Nothing to flush"""
+
+
+def _run(max_field_bytes):
+    """Write LINES lines holding the body, returning the elapsed seconds and characters written"""
+    log_sink = CountingSink()
+    logger = Logger(process_name="benchmark", log_sink=log_sink, max_field_bytes=max_field_bytes)
+    start = time.perf_counter()
+    for _ in range(LINES):
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": BODY})
+    return time.perf_counter() - start, log_sink.written
+
+
+def main():
+    """Run the benchmark"""
+    full, full_written = min(_run(None) for _ in range(3))
+    capped, capped_written = min(_run(16 * 1024) for _ in range(3))
+    print(
+        f"{LINES} lines with a {len(BODY) // 1024}KB field: full {full * 1000:.1f}ms {full_written} chars, "
+        f"capped at 16KB {capped * 1000:.1f}ms {capped_written} chars, speedup {full / capped:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
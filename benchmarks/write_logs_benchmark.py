@@ -0,0 +1,52 @@
+"""
+Benchmark logging the outcome of every record in a batch to standard out,
+comparing a write_log call per record against a single write_logs call
+
+Run from the repository root with:
+    PYTHONPATH=. python benchmarks/write_logs_benchmark.py
+"""
+import contextlib
+import os
+import time
+
+from spine_aws_common.logger import Logger
+
+RECORDS = 1000
+
+
+def _rows():
+    """The substitutions for each record"""
+    return [{"aws_request_id": f"20230101120000000000_{record:06d}"} for record in range(RECORDS)]
+
+
+def _run_write_log(logger):
+    """Write a line per record with write_log, returning the elapsed seconds"""
+    rows = _rows()
+    start = time.perf_counter()
+    for row in rows:
+        logger.write_log("LAMBDA0002", None, row)
+    return time.perf_counter() - start
+
+
+def _run_write_logs(logger):
+    """Write a line per record with write_logs, returning the elapsed seconds"""
+    rows = _rows()
+    start = time.perf_counter()
+    logger.write_logs("LAMBDA0002", rows)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark"""
+    logger = Logger(process_name="benchmark", internal_id="20230101120000000000_ABCDEF")
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        individual = min(_run_write_log(logger) for _ in range(20))
+        batched = min(_run_write_logs(logger) for _ in range(20))
+    print(
+        f"{RECORDS} records to stdout: write_log {individual * 1000:.2f}ms, "
+        f"write_logs {batched * 1000:.2f}ms, speedup {individual / batched:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
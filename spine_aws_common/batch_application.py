@@ -26,8 +26,8 @@ class BatchApplication(LambdaApplication):
         Start the application
         """
         for record in self.records:
-            self.log_object.set_internal_id(self._get_internal_id_from_record(record))
-            self.process_record(record)
+            with self.log_object.bind(internalID=self._get_internal_id_from_record(record)):
+                self.process_record(record)
 
     def _get_internal_id_from_record(self, record):
         """
@@ -11,6 +11,8 @@ from aws_lambda_powertools.utilities import parameters
 from aws_lambda_powertools.utilities.data_classes.common import DictWrapper
 from aws_lambda_powertools.utilities.typing.lambda_context import LambdaContext
 
+from spine_aws_common.log.overrides import SeverityOverrides
+from spine_aws_common.log.sinks import ChannelSink
 from spine_aws_common.logger import Logger, configure_logging_adapter
 from spine_aws_common.utilities import StopWatch
 
@@ -26,6 +28,26 @@ class LambdaApplication:
     # Base class will always return event in same format
     EVENT_TYPE = DictWrapper
 
+    # Minimum level and maximum lines per invocation for noisy libraries, by
+    # logger name prefix, e.g. {"botocore": ("WARN", 100)}
+    LIBRARY_LOG_LEVELS = None
+
+    # SSM parameter holding severity overrides by log reference and process,
+    # e.g. {"logReferences": {"MESH0001": "DEBUG"}}, checked for changes every
+    # SEVERITY_OVERRIDES_TTL seconds
+    SEVERITY_OVERRIDES_PARAMETER = None
+    SEVERITY_OVERRIDES_TTL = SeverityOverrides.DEFAULT_TTL
+
+    # Destinations for log channels to be shipped separately rather than with
+    # everything else on standard out, keyed by LoggingConstants.LFR_*, e.g.
+    # {LoggingConstants.LFR_AUDIT: "/tmp/audit.log"}. See ChannelSink.
+    LOG_CHANNEL_DESTINATIONS = None
+
+    # Caps on the UTF-8 size of log substitutions and lines. Lines over
+    # CloudWatch's event size, less the 26 bytes it adds, would be split.
+    MAX_LOG_FIELD_BYTES = None
+    MAX_LOG_LINE_BYTES = 256 * 1024 - 26
+
     def __init__(self, additional_log_config=None, load_ssm_params=False):
         self.context = None
         self.event = None
@@ -34,7 +56,9 @@ class LambdaApplication:
         self.system_config = self._load_system_config(load_ssm_params=load_ssm_params)
 
         self.log_object = self.get_logger(additional_log_config=additional_log_config)
-        configure_logging_adapter(self.log_object)
+        self.logging_adapter = configure_logging_adapter(self.log_object, self.LIBRARY_LOG_LEVELS)
+        # Set to a LogCollector when work is fanned out to child processes
+        self.log_collector = None
 
         self._log_coldstart()
 
@@ -48,6 +72,8 @@ class LambdaApplication:
         try:
             self.sync_timer = StopWatch()
             self.sync_timer.start_the_clock()
+            self.logging_adapter.reset_library_levels()
+            self.log_object.refresh_severity_overrides()
             self.context = context
             self.event = self.process_event(event)
             self.log_object.set_internal_id(self._get_internal_id())
@@ -65,13 +91,19 @@ class LambdaApplication:
                 print(e)
             else:
                 self.log_object.write_log("LAMBDAINIT001", None, {"message": e})
+                self._log_invocation_summary()
             raise e
         except Exception as e:  # pylint:disable=broad-except
             if self.log_object is None:
                 print(e)
             else:
                 self.log_object.write_log("LAMBDA9999", sys.exc_info(), {"error": str(e)})
+                self._log_invocation_summary()
             raise e
+        finally:
+            # Buffered log sinks hold lines back until the end of the invocation
+            if self.log_object is not None:
+                self.log_object.flush()
 
         return self.response
 
@@ -84,9 +116,27 @@ class LambdaApplication:
         logger = Logger(
             process_name=self.system_config.get("AWS_LAMBDA_FUNCTION_NAME", "None"),
             additional_log_config=additional_log_config,
+            deduplicate_crashdumps=True,
+            severity_overrides=self._create_severity_overrides(),
+            log_sink=ChannelSink(self.LOG_CHANNEL_DESTINATIONS) if self.LOG_CHANNEL_DESTINATIONS else None,
+            max_field_bytes=self.MAX_LOG_FIELD_BYTES,
+            max_line_bytes=self.MAX_LOG_LINE_BYTES,
         )
         return logger
 
+    def _create_severity_overrides(self):
+        """
+        Severity overrides loaded from SEVERITY_OVERRIDES_PARAMETER, if the
+        application has one
+        """
+        if not self.SEVERITY_OVERRIDES_PARAMETER:
+            return None
+        parameter_name = self.SEVERITY_OVERRIDES_PARAMETER
+        return SeverityOverrides(
+            lambda: parameters.get_parameter(parameter_name, transform="json", force_fetch=True),
+            ttl=self.SEVERITY_OVERRIDES_TTL,
+        )
+
     def process_event(self, event):
         """
         Processes event object passed in by Lambda service
@@ -153,12 +203,24 @@ class LambdaApplication:
         }
         self.log_object.write_log("LAMBDA0002", None, log_params)
 
+    def _log_invocation_summary(self):
+        """
+        Write the lines sent by child processes, and those held back or
+        suppressed during the invocation
+        """
+        if self.log_collector is not None:
+            self.log_collector.collect()
+        self.log_object.write_aggregated_logs()
+        self.log_object.write_suppression_summary()
+        self.log_object.reset_crashdump_fingerprints()
+
     def _log_end(self):
+        self._log_invocation_summary()
         log_params = {
             "duration": self.sync_timer.stop_the_clock(),
             "aws_request_id": self._get_aws_request_id(),
         }
-        self.log_object.write_log("LAMBDA0003", None, log_params)
+        self.log_object.write_log_with_metrics("LAMBDA0003", None, log_params)
 
     def _get_aws_request_id(self):
         """Get the request id"""
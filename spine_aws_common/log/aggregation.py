@@ -0,0 +1,88 @@
+"""
+Aggregation of repeated identical log lines within an invocation
+"""
+from collections import namedtuple
+
+from spine_aws_common.log.constants import LoggingConstants
+from spine_aws_common.log.formatting import LogTemplate
+
+AggregatedLog = namedtuple(
+    "AggregatedLog",
+    ["log_reference", "process_name", "internal_id", "occurrences", "first_logged", "last_logged", "substitutions"],
+)
+
+AGGREGATION_TEXT = ' occurrences={occurrences} firstLogged="{firstLogged}" lastLogged="{lastLogged}"'
+
+
+_IDENTIFIERS = frozenset(LoggingConstants.IDENTIFIERS)
+
+
+def _substitution_key(substitution_dict):
+    """
+    Hashable form of the substitutions, so identical lines can be matched.
+    The per-record identifiers are left out, so the same line logged for each
+    record of a batch is matched.
+    """
+    return tuple(
+        sorted((key, repr(value)) for key, value in substitution_dict.items() if key not in _IDENTIFIERS)
+    )
+
+
+class LogAggregator:
+    """
+    Collect the log lines for selected log references, so that each distinct
+    (log reference, masked substitutions) pair is written once at the end of
+    the invocation with the number of occurrences and when the first and last
+    were logged. Lines differing only in their internal ID or session ID are
+    counted together, and written with those of the first.
+    At most max_entries distinct lines are held, beyond that lines are not
+    aggregated and should be written as normal.
+    """
+
+    DEFAULT_MAX_ENTRIES = 1000
+
+    def __init__(self, log_references, max_entries=DEFAULT_MAX_ENTRIES):
+        self.log_references = frozenset(log_references)
+        self.max_entries = max_entries
+        self._entries = {}
+        self._templates = {}
+
+    def __contains__(self, log_reference):
+        return log_reference in self.log_references
+
+    def add(self, log_reference, process_name, internal_id, substitution_dict, time_now):
+        """
+        Count an occurrence of the log line, returning False if it could not be
+        held and so must be written now
+        """
+        # pylint:disable=too-many-arguments
+        key = (log_reference, process_name, _substitution_key(substitution_dict))
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_entries:
+                return False
+            # Copy the substitutions as the caller is free to change them
+            self._entries[key] = [1, time_now, time_now, dict(substitution_dict), internal_id]
+        else:
+            entry[0] += 1
+            entry[2] = time_now
+        return True
+
+    def template(self, log_reference, log_text):
+        """The log template extended with the occurrence count and times"""
+        log_template = self._templates.get(log_reference)
+        if log_template is None:
+            log_template = self._templates[log_reference] = LogTemplate(log_text + AGGREGATION_TEXT)
+        return log_template
+
+    def reset(self):
+        """
+        Start a new invocation, returning the lines aggregated during the last
+        one in the order they were first logged
+        """
+        entries = self._entries
+        self._entries = {}
+        return [
+            AggregatedLog(key[0], key[1], entry[4], entry[0], entry[1], entry[2], entry[3])
+            for key, entry in entries.items()
+        ]
@@ -0,0 +1,69 @@
+"""
+Background writing of log lines, so that rendering and output happen off the
+calling thread
+"""
+import queue
+import sys
+import threading
+
+
+class BackgroundLogWriter:
+    """
+    Run log writes on a daemon thread fed by a bounded queue.
+    Callers submit already masked log events with the function that renders
+    and writes them. When the queue is full callers either block until there
+    is space (the default, so nothing is lost) or the event is dropped and
+    counted. drain() must be called before the end of each invocation, as a
+    Lambda execution environment may be frozen with events still queued.
+    """
+
+    BLOCK = "block"
+    DROP = "drop"
+
+    DEFAULT_MAX_QUEUE_SIZE = 10000
+
+    def __init__(self, max_queue_size=DEFAULT_MAX_QUEUE_SIZE, full_queue_policy=BLOCK):
+        if full_queue_policy not in (self.BLOCK, self.DROP):
+            raise ValueError(f"Unknown full queue policy {full_queue_policy}")
+        self.full_queue_policy = full_queue_policy
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Start the writer thread on first use"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="spine-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, write_function, *args):
+        """Queue a log event to be written by write_function(*args)"""
+        # A forked child inherits the writer thread only as a dead reference
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        try:
+            self._queue.put_nowait((write_function, args))
+        except queue.Full:
+            if self.full_queue_policy == self.BLOCK:
+                self._queue.put((write_function, args))
+            else:
+                self.dropped += 1
+
+    def _run(self):
+        """Write queued log events until the process ends"""
+        while True:
+            write_function, args = self._queue.get()
+            try:
+                write_function(*args)
+            except Exception as err:  # pylint:disable=broad-except
+                # A failure to write one line must not stop the writer thread
+                print(f"Background log write failure: {err!r}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Block until every queued log event has been written"""
+        if self._thread is not None:
+            self._queue.join()
@@ -0,0 +1,99 @@
+"""
+Log fields bound to the current context, so that per-record identifiers are
+carried by the thread or asyncio task doing the work rather than set on the
+shared logger
+"""
+import contextvars
+
+from spine_aws_common.log.formatting import add_default_keys, evaluate_log_keys, resolve_lazy_values
+
+INTERNAL_ID = "internalID"
+
+CURRENT_BINDING = contextvars.ContextVar("spine_log_binding", default=None)
+
+# The tokens for restoring the bindings in place before each entered "with"
+# block, held per context so a bound logger can be entered by several threads
+# or asyncio tasks at once
+_ENTERED_TOKENS = contextvars.ContextVar("spine_log_binding_tokens", default=())
+
+
+class LogBinding:
+    """
+    Fields bound to a logger: the internal ID for the preamble, the default
+    substitutions already evaluated as write_log would, and the preamble text
+    already rendered for them by (log_level, log_reference, process_name,
+    internal_id)
+    """
+
+    # pylint:disable=too-few-public-methods
+
+    __slots__ = ("log_object", "internal_id", "fields", "audit_log_required", "preamble_prefixes")
+
+    def __init__(self, log_object, fields):
+        self.log_object = log_object
+        # Resolved first, so a lazily given internalID is written as its value
+        resolve_lazy_values(fields)
+        self.internal_id = fields.get(INTERNAL_ID)
+        add_default_keys(fields)
+        self.fields = fields
+        self.audit_log_required = evaluate_log_keys(fields)
+        self.preamble_prefixes = {}
+
+
+class BoundLogger:
+    """
+    A lightweight child of a logger with fields bound to it, returned by
+    bind(). Lines written through it carry the bound internalID in their
+    preamble and the bound fields as default substitutions, which the
+    substitutions passed to write_log override.
+    Used as a context manager, the binding also applies to lines written
+    through the parent logger within the current thread or asyncio task, e.g.
+        with log_object.bind(internalID=internal_id):
+            process_record(record)
+    Anything else is looked up on the parent logger, without the binding.
+    """
+
+    # The binding is passed straight to the parent rather than set in the
+    # context for each line written through the child
+    # pylint:disable=protected-access
+
+    def __init__(self, log_object, fields):
+        self._log_object = log_object
+        self._binding = LogBinding(log_object, fields)
+
+    def bind(self, **fields):
+        """A child with further fields bound, overriding those already bound"""
+        return BoundLogger(self._log_object, dict(self._binding.fields, **fields))
+
+    @property
+    def internal_id(self):
+        """The bound internal ID, or the parent's if none is bound"""
+        return self._binding.internal_id or self._log_object.internal_id
+
+    def write_log(self, *args, **kwargs):
+        """Write the log as the parent's write_log, with the bound fields"""
+        return self._log_object._write_log(self._binding, *args, **kwargs)
+
+    def write_log_with_metrics(self, *args, **kwargs):
+        """Write the log as the parent's write_log_with_metrics, with the bound fields"""
+        return self._log_object._write_log_with_metrics(self._binding, *args, **kwargs)
+
+    def write_logs(self, *args, **kwargs):
+        """Write the logs as the parent's write_logs, with the bound fields"""
+        return self._log_object._write_logs(self._binding, *args, **kwargs)
+
+    def current_internal_id(self):
+        """The internal ID lines written through this child carry"""
+        return self.internal_id
+
+    def __enter__(self):
+        _ENTERED_TOKENS.set(_ENTERED_TOKENS.get() + (CURRENT_BINDING.set(self._binding),))
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        tokens = _ENTERED_TOKENS.get()
+        _ENTERED_TOKENS.set(tokens[:-1])
+        CURRENT_BINDING.reset(tokens[-1])
+
+    def __getattr__(self, name):
+        return getattr(self._log_object, name)
@@ -0,0 +1,188 @@
+"""
+Collection of log lines from child processes, so that work fanned out to
+child processes is logged through the parent's log sink rather than each
+child printing to a shared standard out
+"""
+import multiprocessing
+import multiprocessing.connection
+import threading
+
+from spine_aws_common.log.binding import INTERNAL_ID
+from spine_aws_common.log.constants import LoggingConstants
+
+
+class ConnectionSink:
+    """
+    Send rendered, masked log lines from a child process to the parent's
+    LogCollector over the child's own pipe connection. Lines are sent in
+    batches of batch_size, and the child must flush its logger once its work
+    is done so that no lines are held back.
+    Tracebacks are rendered in the child as exceptions may not be picklable.
+    """
+
+    formats_exceptions = False
+
+    DEFAULT_BATCH_SIZE = 100
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE):
+        self.connection = connection
+        self.batch_size = batch_size
+        self._batch = []
+
+    def write(self, log_line, log_type):
+        """Batch a single rendered log line with its channel"""
+        self._batch.append((log_type, log_line))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send the batched lines to the parent"""
+        if not self._batch:
+            return
+        batch = self._batch
+        self._batch = []
+        self.connection.send(batch)
+
+
+class LogCollector:
+    """
+    Receive log lines from child processes and write them to the parent
+    logger's sink, on the channels the children wrote them to.
+    Each child has its own pipe, as multiprocessing queues and pools need
+    shared memory semaphores which Lambda does not provide. Lines are received
+    on a daemon thread as soon as they are sent, so children never block on a
+    full pipe, but are only written to the sink by collect(), called by the
+    parent (by LambdaApplication at the end of each invocation) once the
+    children's work is done. The parent therefore remains the single writer to
+    its sink, and each child's lines are written in the order they were sent.
+
+    Each child creates its logger from its own child_logger_settings(), and
+    binds the internal ID of each task it is given, e.g.
+        child = multiprocessing.Process(target=work, args=(collector.child_logger_settings(), task))
+    where work creates Logger(**settings) and logs within
+        with logger.bind(**task_log_fields):
+    task_log_fields being collector.task_log_fields() when the task was
+    created.
+    """
+
+    # pylint:disable=too-many-instance-attributes
+
+    def __init__(self, log_object):
+        self.log_object = log_object
+        self._readers = []
+        self._handed_out = []
+        self._batches = []
+        self._lock = threading.Lock()
+        self._collected = threading.Condition(self._lock)
+        self._collect_marker = 0
+        self._received_marker = 0
+        self._wake_reader, self._wake_writer = multiprocessing.Pipe(duplex=False)
+        self._thread = None
+
+    def child_logger_settings(self, batch_size=ConnectionSink.DEFAULT_BATCH_SIZE):
+        """
+        The Logger arguments for one child process, carrying the parent's
+        process name, severity threshold and output format and sending its
+        lines to this collector over a new pipe. Custom log bases are passed
+        by the child as usual.
+        """
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        with self._lock:
+            self._readers.append(reader)
+            self._handed_out.append(writer)
+        self._start()
+        self._wake_writer.send(0)
+        return {
+            "process_name": self.log_object.process_name,
+            "severity_threshold": self.log_object.severity_threshold,
+            "output_format": (
+                LoggingConstants.OUTPUT_JSON if self.log_object.json_output else LoggingConstants.OUTPUT_TEXT
+            ),
+            "log_sink": ConnectionSink(writer, batch_size),
+        }
+
+    def task_log_fields(self):
+        """
+        The fields for a child to bind while working on a task, carrying the
+        internal ID in effect in the parent when the task was created
+        """
+        return {INTERNAL_ID: self.log_object.current_internal_id()}
+
+    def _start(self):
+        """Start the receiving thread on first use"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._receive, name="spine-log-collector", daemon=True)
+                self._thread.start()
+
+    def _receive(self):
+        """Receive batches of log lines until the process ends"""
+        while True:
+            with self._lock:
+                readers = list(self._readers)
+            for ready in multiprocessing.connection.wait(readers + [self._wake_reader]):
+                if ready is self._wake_reader:
+                    marker = self._wake_reader.recv()
+                    if marker:
+                        self._receive_waiting(readers)
+                        with self._lock:
+                            # Everything sent before collect() was called has arrived
+                            self._received_marker = marker
+                            self._collected.notify_all()
+                else:
+                    self._receive_from(ready)
+
+    def _receive_waiting(self, readers):
+        """Receive every batch already sent on any of the pipes"""
+        waiting = True
+        while waiting:
+            waiting = False
+            for reader in readers:
+                if not reader.closed and reader.poll():
+                    self._receive_from(reader)
+                    waiting = True
+
+    def _receive_from(self, reader):
+        """Receive a batch from a child, dropping its pipe once the child has gone"""
+        if reader.closed:
+            return
+        try:
+            batch = reader.recv()
+        except (EOFError, OSError):
+            with self._lock:
+                self._readers.remove(reader)
+            reader.close()
+            return
+        with self._lock:
+            self._batches.append(batch)
+
+    def collect(self):
+        """
+        Write every line sent by the children so far to the parent's log sink.
+        Children must have been started and have flushed their loggers before
+        this is called. The parent's copies of their pipes are then closed.
+        """
+        if self._thread is None:
+            return
+        with self._lock:
+            self._collect_marker += 1
+            marker = self._collect_marker
+            handed_out = self._handed_out
+            self._handed_out = []
+        self._wake_writer.send(marker)
+        with self._lock:
+            self._collected.wait_for(lambda: self._received_marker >= marker)
+            batches = self._batches
+            self._batches = []
+        for writer in handed_out:
+            # Only the child needs to write, and the pipe is dropped once it
+            # has gone
+            writer.close()
+
+        if self.log_object.background_writer:
+            # Keep the parent's own lines ahead of the children's
+            self.log_object.background_writer.drain()
+        log_sink = self.log_object.log_sink
+        for batch in batches:
+            for log_type, log_line in batch:
+                log_sink.write(log_line, log_type)
@@ -0,0 +1,175 @@
+"""
+Compiled log bases, so that cold starts don't parse every log base cfg file.
+
+A log base is compiled at build time with:
+    python -m spine_aws_common.log.logbasecompiler mylogbase.cfg
+which writes mylogbase.cfg.compiled alongside it. When a compiled file is
+present and up to date it is used in place of the cfg file, otherwise the cfg
+file is parsed as before.
+"""
+import marshal
+import struct
+import zlib
+from collections.abc import Mapping
+
+from spine_aws_common.log.formatting import LogTemplate
+from spine_aws_common.log.spinelogging import get_log_base_config, parse_log_base_config
+
+COMPILED_SUFFIX = ".compiled"
+
+# Magic, marshal version and header length, followed by the marshalled header
+# holding the index of (start, end) offsets and then the individually
+# marshalled entries
+_MAGIC = b"SPINELOGBASE1"
+_PREFIX = struct.Struct("<II")
+
+
+def _source_paths(log_base):
+    """The cfg files making up the log base, which may be a path or list of paths"""
+    if isinstance(log_base, (list, tuple)):
+        return [str(path) for path in log_base]
+    return [str(log_base)]
+
+
+def compiled_path(log_base):
+    """Where the compiled form of the log base is kept"""
+    return _source_paths(log_base)[0] + COMPILED_SUFFIX
+
+
+def _fingerprint(path):
+    """
+    Size and checksum of the cfg file, used to spot a stale compiled file.
+    Modification times are not used as they are not kept by packaging.
+    """
+    try:
+        with open(path, "rb") as cfg_file:
+            content = cfg_file.read()
+    except OSError:
+        return None
+    return (len(content), zlib.crc32(content))
+
+
+class CompiledLogBase(Mapping):
+    """
+    Read only log base dictionary backed by a compiled file. Only the index is
+    decoded on load, each entry is decoded the first time it is used.
+    """
+
+    def __init__(self, data, index, option_names):
+        self._data = memoryview(data)
+        self._index = index
+        self._decoded = {}
+        self.option_names = frozenset(option_names)
+
+    def __getitem__(self, log_reference):
+        log_entry = self._decoded.get(log_reference)
+        if log_entry is None:
+            offset, end = self._index[log_reference]
+            log_entry = self._decoded[log_reference] = marshal.loads(self._data[offset:end])
+        return log_entry
+
+    def __contains__(self, log_reference):
+        return log_reference in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+def log_base_option_names(log_base_dict):
+    """The names of all options other than level and text used in the log base"""
+    option_names = getattr(log_base_dict, "option_names", None)
+    if option_names is None:
+        option_names = {option for log_entry in log_base_dict.values() if len(log_entry) > 2 for option in log_entry[2]}
+    return option_names
+
+
+def write_compiled_log_base(log_base, log_base_dict, output_path=None):
+    """
+    Write the compiled form of a parsed log base, recording the cfg files it
+    was compiled from so that it can be checked for staleness
+    """
+    entries = []
+    index = {}
+    offset = 0
+    for log_reference, log_entry in log_base_dict.items():
+        encoded = marshal.dumps(list(log_entry))
+        index[log_reference] = (offset, offset + len(encoded))
+        entries.append(encoded)
+        offset += len(encoded)
+
+    header = marshal.dumps(
+        {
+            "sources": [_fingerprint(path) for path in _source_paths(log_base)],
+            "options": sorted(log_base_option_names(log_base_dict)),
+            "index": index,
+        }
+    )
+
+    output_path = output_path or compiled_path(log_base)
+    with open(output_path, "wb") as compiled_file:
+        compiled_file.write(_MAGIC + _PREFIX.pack(marshal.version, len(header)) + header + b"".join(entries))
+    return output_path
+
+
+def load_compiled_log_base(log_base, path=None):
+    """
+    Load the compiled log base, returning None where there is no compiled file
+    or it no longer matches the cfg files it was compiled from
+    """
+    path = path or compiled_path(log_base)
+    try:
+        with open(path, "rb") as compiled_file:
+            data = compiled_file.read()
+    except OSError:
+        return None
+
+    header_start = len(_MAGIC) + _PREFIX.size
+    if not data.startswith(_MAGIC) or len(data) < header_start:
+        print(f"Compiled log base is invalid - fail build: {path}")
+        return None
+    version, header_length = _PREFIX.unpack_from(data, len(_MAGIC))
+    if version != marshal.version:
+        return None
+
+    header_end = header_start + header_length
+    try:
+        header = marshal.loads(memoryview(data)[header_start:header_end])
+    except (EOFError, ValueError, TypeError):
+        print(f"Compiled log base is invalid - fail build: {path}")
+        return None
+
+    if header["sources"] != [_fingerprint(source) for source in _source_paths(log_base)]:
+        print(f"Compiled log base is out of date - fail build: {path}")
+        return None
+
+    return CompiledLogBase(data[header_end:], header["index"], header["options"])
+
+
+def get_log_base(log_base):
+    """
+    Get the log base dictionary, from the compiled file when it is up to date
+    and otherwise by parsing the cfg files
+    """
+    if not log_base:
+        return None
+    return load_compiled_log_base(log_base) or get_log_base_config(log_base)
+
+
+def compile_log_base(log_base, output_path=None):
+    """
+    Compile the log base cfg files, returning the path written or None if any
+    log text is invalid
+    """
+    log_base_dict = parse_log_base_config(log_base)
+    valid = True
+    for log_reference, log_entry in log_base_dict.items():
+        error = LogTemplate(log_entry[1]).error
+        if error:
+            print(f"Invalid log text - fail build: logReference={log_reference} {error}")
+            valid = False
+    if not valid:
+        return None
+    return write_compiled_log_base(log_base, log_base_dict, output_path)
@@ -11,6 +11,9 @@ class LoggingConstants:
 
     SECTION_LEVEL = "Log Level"
     SECTION_TEXT = "Log Text"
+    SECTION_SAMPLE_RATE = "Sample Rate"
+    SECTION_RATE_LIMIT = "Rate Limit"
+    SECTION_RATE_BURST = "Rate Burst"
 
     LFR_OPERATIONS = "operations"
     LFR_AUDIT = "audit"
@@ -29,8 +32,13 @@ class LoggingConstants:
     AUDIT = 0
 
     LR_CRASHDUMP = "UTI9992"
+    LR_SUPPRESSED = "LAMBDA0004"
     LOG_SUFFIX = ".log"
+    FILE_DATE_FORMAT = "%Y%m%d%H"
 
     IDENTIFIERS = ["internalID", "sessionid"]
 
     SPINE_LOGGER = "spine"
+
+    OUTPUT_TEXT = "text"
+    OUTPUT_JSON = "json"
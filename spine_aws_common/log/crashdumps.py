@@ -0,0 +1,70 @@
+"""
+Formatting of crashdump tracebacks, writing repeats of the same failure within
+an invocation as short references rather than in full
+"""
+import traceback
+import zlib
+
+DEFAULT_MAX_TRACEBACK_LENGTH = 32 * 1024
+
+TRUNCATION_TEXT = "... traceback truncated originalLength={} ... "
+REPEAT_TEXT = "Repeated crashdump crashdumpFingerprint={} occurrences={}"
+
+
+def cap_traceback(formatted_exception, max_traceback_length=DEFAULT_MAX_TRACEBACK_LENGTH):
+    """
+    Cap the length of a formatted traceback, keeping the end as that holds the
+    innermost frames and the exception itself
+    """
+    original_length = len(formatted_exception)
+    if max_traceback_length is None or original_length <= max_traceback_length:
+        return formatted_exception
+    kept_from = original_length - max_traceback_length
+    return TRUNCATION_TEXT.format(original_length) + formatted_exception[kept_from:]
+
+
+def format_exception(error_list, max_traceback_length=DEFAULT_MAX_TRACEBACK_LENGTH):
+    """Format the traceback for a crashdump, on a single line once rendered"""
+    exception, value, trace = error_list
+    return cap_traceback(" ".join(traceback.format_exception(exception, value, trace)), max_traceback_length)
+
+
+class CrashdumpDeduplicator:
+    """
+    Fingerprint crashdumps by exception type and stack frames. The first
+    crashdump for a fingerprint is formatted in full with the fingerprint, and
+    later ones only as a reference to it with the number of occurrences so far,
+    without formatting the traceback.
+    Fingerprints are held until reset at the end of each invocation.
+    """
+
+    def __init__(self, max_traceback_length=DEFAULT_MAX_TRACEBACK_LENGTH):
+        self.max_traceback_length = max_traceback_length
+        self._occurrences = {}
+
+    @staticmethod
+    def fingerprint(error_list):
+        """A short fingerprint of the exception type and the frames it passed through"""
+        exception, _, trace = error_list
+        frames = tuple(
+            (frame.f_code.co_filename, line_number, frame.f_code.co_name)
+            for frame, line_number in traceback.walk_tb(trace)
+        )
+        return f"{zlib.crc32(repr((getattr(exception, '__qualname__', exception), frames)).encode()):08x}"
+
+    def format(self, error_list):
+        """
+        The traceback text for the crashdump, and whether this is the first
+        occurrence of its fingerprint
+        """
+        fingerprint = self.fingerprint(error_list)
+        occurrences = self._occurrences.get(fingerprint, 0) + 1
+        self._occurrences[fingerprint] = occurrences
+        if occurrences > 1:
+            return REPEAT_TEXT.format(fingerprint, occurrences), False
+        formatted_exception = format_exception(error_list, self.max_traceback_length)
+        return formatted_exception + " crashdumpFingerprint=" + fingerprint, True
+
+    def reset(self):
+        """Forget the fingerprints seen, for the next invocation"""
+        self._occurrences = {}
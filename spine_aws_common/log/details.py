@@ -1,95 +1,262 @@
 """
 Created 18th June 2019
 """
-from copy import deepcopy
 import configparser
 import logging
+from collections import ChainMap
 
+from spine_aws_common.log.compiledlogbase import get_log_base, log_base_option_names
 from spine_aws_common.log.constants import LoggingConstants
+from spine_aws_common.log.formatting import LogTemplate
+from spine_aws_common.log.masking import create_masking_plan, normalise_masked_keys
+
+# Log level text as found in the log base mapped to
+# (log_value, log_level, monitor_log_required, audit_log_required)
+_LEVEL_DEFINITIONS = {
+    "AUDIT": (LoggingConstants.AUDIT, "AUDIT", False, True),
+    "AUDIT-MONITOR": (LoggingConstants.AUDIT, "AUDIT", True, True),
+    "INFO-MONITOR": (LoggingConstants.INFO, "INFO", True, False),
+    "CRITICAL": (LoggingConstants.CRITICAL, "CRITICAL", False, False),
+    "ERROR": (LoggingConstants.ERROR, "ERROR", False, False),
+    "WARN": (LoggingConstants.WARN, "WARN", False, False),
+    "INFO": (LoggingConstants.INFO, "INFO", False, False),
+    "INFORM": (LoggingConstants.INFO, "INFORM", False, False),
+    "DEBUG": (LoggingConstants.DEBUG, "DEBUG", False, False),
+    "TRACE": (LoggingConstants.TRACE, "TRACE", False, False),
+}
+
+# Log base options which mean log lines may be suppressed
+_LIMIT_OPTIONS = frozenset(
+    option.lower() for option in (LoggingConstants.SECTION_SAMPLE_RATE, LoggingConstants.SECTION_RATE_LIMIT)
+)
+
+_LOG_CATALOG_CACHE = {}
 
 
 class LogDetails:
     """
-    Object to hold certain log details
+    Immutable object to hold the details of a single log reference.
+    Instances are shared between log calls so must never be modified.
     """
 
-    def __init__(self, log_text, log_value, log_level, monitor_log_required, audit_log_required):
+    # pylint:disable=no-member
+
+    __slots__ = (
+        "log_text",
+        "log_template",
+        "masking_plan",
+        "log_value",
+        "log_level",
+        "monitor_log_required",
+        "audit_log_required",
+        "sample_rate",
+        "rate_limit",
+        "rate_burst",
+    )
+
+    def __init__(
+        self, log_text, log_value, log_level, monitor_log_required, audit_log_required, masked_keys=None, options=None
+    ):
         # pylint:disable=too-many-arguments
-        self.log_text = log_text
-        self.log_value = log_value
-        self.log_level = log_level
-        self.monitor_log_required = monitor_log_required
-        self.audit_log_required = audit_log_required
+        log_template = LogTemplate(log_text)
+        object.__setattr__(self, "log_text", log_text)
+        object.__setattr__(self, "log_template", log_template)
+        object.__setattr__(self, "masking_plan", create_masking_plan(log_template.field_names, masked_keys))
+        object.__setattr__(self, "log_value", log_value)
+        object.__setattr__(self, "log_level", log_level)
+        object.__setattr__(self, "monitor_log_required", monitor_log_required)
+        object.__setattr__(self, "audit_log_required", audit_log_required)
+
+        options = options or {}
+        rate_limit = _option_value(options, LoggingConstants.SECTION_RATE_LIMIT)
+        rate_burst = _option_value(options, LoggingConstants.SECTION_RATE_BURST)
+        object.__setattr__(self, "sample_rate", _option_value(options, LoggingConstants.SECTION_SAMPLE_RATE))
+        object.__setattr__(self, "rate_limit", rate_limit)
+        object.__setattr__(self, "rate_burst", rate_burst or (max(rate_limit, 1.0) if rate_limit else None))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"LogDetails is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"LogDetails is immutable, cannot delete {name}")
+
+    def __repr__(self):
+        return f"LogDetails(log_level={self.log_level!r}, log_text={self.log_text!r})"
+
+    @property
+    def has_limits(self):
+        """Is the log reference sampled or rate limited"""
+        return self.sample_rate is not None or self.rate_limit is not None
+
+    def is_logged(self, severity_threshold_value):
+        """Check the numeric severity threshold to see if the message should be logged"""
+        return self.log_value <= severity_threshold_value
 
     def check_log_severity_for_log(self, severity_threshold_override, default_severity_threshold):
         """Check to see if the log_value requires the message to be logged"""
-        severity_threshold = severity_threshold_override
-        if not severity_threshold:
-            severity_threshold = default_severity_threshold
+        return self.is_logged(level_value(severity_threshold_override or default_severity_threshold))
 
-        severity_threshold_value = return_level(severity_threshold)[0]
-
-        # Log severity does not meet the severity threshold so ignore
-        if self.log_value > severity_threshold_value:
-            return False
-        return True
+    @staticmethod
+    def is_crashdump_required(severity_threshold_value, error_list):
+        """
+        If logging at INFO or below and a traceback exists - produce a crashdump
+        """
+        return bool(severity_threshold_value >= LoggingConstants.INFO and error_list)
 
     @staticmethod
     def check_log_severity_for_crashdump(severity_threshold_override, default_severity_threshold, error_list):
         """
         If more than an INFO log an a traceback exists - produce a crashdump
         """
-        severity_threshold = severity_threshold_override
-        if not severity_threshold:
-            severity_threshold = default_severity_threshold
+        return LogDetails.is_crashdump_required(
+            level_value(severity_threshold_override or default_severity_threshold), error_list
+        )
 
-        severity_threshold_value = return_level(severity_threshold)[0]
-        if severity_threshold_value >= LoggingConstants.INFO and error_list:
-            return True
-        return False
+
+def _option_value(options, option):
+    """
+    Read a numeric log base option, reporting values which can't be used
+    """
+    value = options.get(option.lower())
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Invalid log option - fail build: {option}={value}")
+        return None
 
 
 def return_level(log_level):
     """
     Converts between Text and numeric form of syslog references
     """
-    audit_log_required = False
-    monitor_log_required = False
-
-    if log_level == "AUDIT":
-        log_value = LoggingConstants.AUDIT
-        audit_log_required = True
-    elif log_level == "AUDIT-MONITOR":
-        log_value = LoggingConstants.AUDIT
-        log_level = "AUDIT"
-        audit_log_required = True
-        monitor_log_required = True
-    elif log_level == "INFO-MONITOR":
-        log_value = LoggingConstants.INFO
-        log_level = "INFO"
-        monitor_log_required = True
-    elif log_level == "CRITICAL":
-        log_value = LoggingConstants.CRITICAL
-    elif log_level == "ERROR":
-        log_value = LoggingConstants.ERROR
-    elif log_level == "WARN":
-        log_value = LoggingConstants.WARN
-    elif log_level in ["INFO", "INFORM"]:
-        log_value = LoggingConstants.INFO
-    elif log_level == "DEBUG":
-        log_value = LoggingConstants.DEBUG
-    elif log_level == "TRACE":
-        log_value = LoggingConstants.TRACE
-    else:
-        log_value = LoggingConstants.AUDIT
-
-    return log_value, log_level, monitor_log_required, audit_log_required
+    return _LEVEL_DEFINITIONS.get(log_level, (LoggingConstants.AUDIT, log_level, False, False))
+
+
+def level_value(log_level):
+    """
+    Numeric form of a textual severity level
+    """
+    return return_level(log_level)[0]
+
+
+def is_known_level(log_level):
+    """
+    Check a textual severity level is one the log base understands
+    """
+    return log_level in _LEVEL_DEFINITIONS
+
+
+def create_log_details(log_level, log_text, masked_keys=None, options=None):
+    """
+    Create the LogDetails for a log base level and text pair
+    """
+    # pylint:disable=too-many-arguments
+    [log_value, log_level, monitor_log_required, audit_log_required] = return_level(log_level)
+    return LogDetails(log_text, log_value, log_level, monitor_log_required, audit_log_required, masked_keys, options)
+
+
+class LogCatalog:
+    """
+    Catalog of LogDetails, built from the log base dictionary so that no
+    per-call parsing or copying is required to resolve a log reference.
+    Each entry's masking plan is worked out from the masked keys here too.
+    Entries are built the first time each log reference is used, so a large
+    log base costs little at cold start.
+    """
+
+    def __init__(self, log_base_dict, masked_keys=None, option_names=None):
+        self.masked_keys = normalise_masked_keys(masked_keys)
+        self._log_base_dict = log_base_dict
+        self._entries = {}
+        self._extended = {}
+        self._has_entries = bool(log_base_dict)
+        if option_names is None:
+            option_names = log_base_option_names(log_base_dict)
+        self.has_limits = not _LIMIT_OPTIONS.isdisjoint(option_names)
+
+    def __bool__(self):
+        # Checked on every write, so avoid counting the entries
+        return self._has_entries
+
+    def __len__(self):
+        return len(self._log_base_dict)
+
+    def __contains__(self, log_reference):
+        return log_reference in self._log_base_dict
+
+    def __iter__(self):
+        return iter(self._log_base_dict)
+
+    def get(self, log_reference):
+        """
+        Lookup the details for the log reference, falling back to the default
+        UTI9999 details where the reference is not in the log base
+        """
+        log_details = self._entries.get(log_reference)
+        if log_details is None:
+            log_details = self._entries[log_reference] = self._create_log_details(log_reference)
+        return log_details
+
+    def get_with_fields(self, log_reference, field_names):
+        """
+        Lookup the details for the log reference with each of the extra fields
+        appended to the log text as field_name={field_name}
+        """
+        log_details = self._extended.get((log_reference, field_names))
+        if log_details is None:
+            base_details = self.get(log_reference)
+            log_details = self._extended[(log_reference, field_names)] = LogDetails(
+                base_details.log_text + "".join(f" {field_name}={{{field_name}}}" for field_name in field_names),
+                base_details.log_value,
+                base_details.log_level,
+                base_details.monitor_log_required,
+                base_details.audit_log_required,
+                self.masked_keys,
+            )
+        return log_details
+
+    def _create_log_details(self, log_reference):
+        """Build the details for a log reference on first use"""
+        # pylint:disable=no-member
+        log_entry = self._log_base_dict.get(log_reference)
+        if log_entry is None:
+            print("Missing log reference - fail build")
+            if "UTI9999" in self._log_base_dict:
+                return self.get("UTI9999")
+            return create_log_details("INFO", "Missing default log", self.masked_keys)
+
+        log_details = create_log_details(log_entry[0], log_entry[1], self.masked_keys, *log_entry[2:])
+        if log_details.log_template.error:
+            print(f"Invalid log text - fail build: logReference={log_reference} {log_details.log_template.error}")
+        return log_details
+
+
+def get_log_catalog(log_base, additional_log_config=None, masked_keys=None):
+    """
+    Get the log catalog for the log base and any additional log config.
+    Catalogs are cached so are only built once per process.
+    """
+    masked_keys = normalise_masked_keys(masked_keys)
+    cache_key = (str(log_base), str(additional_log_config), frozenset(masked_keys.items()))
+    log_catalog = _LOG_CATALOG_CACHE.get(cache_key)
+    if log_catalog is None:
+        log_bases = [get_log_base(log_base) or {}]
+        if additional_log_config:
+            log_bases.insert(0, get_log_base(additional_log_config))
+        # Entries in the additional log config take precedence
+        log_base_dict = ChainMap(*log_bases) if len(log_bases) > 1 else log_bases[0]
+        option_names = set().union(*(log_base_option_names(log_base_map) for log_base_map in log_bases))
+        log_catalog = _LOG_CATALOG_CACHE[cache_key] = LogCatalog(log_base_dict, masked_keys, option_names)
+    return log_catalog
 
 
 def _get_log_details(log_reference, log_base_dict, log_base_cache, pythonlogging):
     """
     Lookup the log text and severity for the specified log reference.
-    Cache the outcome to prevent repeated hits on the config object
+    Cache the outcome to prevent repeated hits on the config object.
+    LogDetails are immutable so the cached object is returned directly.
     """
     log_details_obj = log_base_cache.get(log_reference)
 
@@ -97,14 +264,12 @@ def _get_log_details(log_reference, log_base_dict, log_base_cache, pythonlogging
         # Cache miss
         log_info = log_base_dict.get(log_reference)
         if log_info:
-            log_level, log_text = log_info
+            log_level, log_text = log_info[:2]
         else:
-            log_level, log_text = log_base_dict.get("UTI9999", ["INFO", "Missing default log"])
+            log_level, log_text = log_base_dict.get("UTI9999", ["INFO", "Missing default log"])[:2]
             print("Missing log reference - fail build")
 
-        [log_value, log_level, monitor_log_required, audit_log_required] = return_level(log_level)
-
-        log_details_obj = LogDetails(log_text, log_value, log_level, monitor_log_required, audit_log_required)
+        log_details_obj = create_log_details(log_level, log_text)
 
         if pythonlogging:
             logger = logging.getLogger(LoggingConstants.SPINE_LOGGER)
@@ -112,12 +277,14 @@ def _get_log_details(log_reference, log_base_dict, log_base_cache, pythonlogging
         else:
             log_base_cache[log_reference] = log_details_obj
 
-    return deepcopy(log_details_obj)
+    return log_details_obj
 
 
 def get_log_details(log_reference, log_base_dict, log_base_cache, pythonlogging=True):
     """
     Get the logging text and level details based on the log reference
+    Kept for compatibility, as the log engine looks up log references in its
+    LogCatalog
     """
     try:
         log_details = _get_log_details(log_reference, log_base_dict, log_base_cache, pythonlogging)
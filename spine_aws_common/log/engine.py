@@ -0,0 +1,755 @@
+"""
+The log pipeline shared by Logger and logutil.write_log: resolving the log
+reference, checking severity, masking, rendering and handing the rendered lines
+to a log sink
+"""
+import datetime
+import time
+
+from spine_aws_common.log.aggregation import LogAggregator
+from spine_aws_common.log.binding import CURRENT_BINDING, BoundLogger
+from spine_aws_common.log.constants import LoggingConstants
+from spine_aws_common.log.crashdumps import DEFAULT_MAX_TRACEBACK_LENGTH, CrashdumpDeduplicator, format_exception
+from spine_aws_common.log.details import LogDetails, level_value
+from spine_aws_common.log.formatting import (
+    add_default_keys,
+    create_log_line,
+    evaluate_log_keys,
+    resolve_lazy_values,
+    substitute_preamble_for_monitor,
+)
+from spine_aws_common.log.jsonformatting import create_json_log_line, create_json_preamble
+from spine_aws_common.log.masking import apply_masking_plan, mask_url
+from spine_aws_common.log.metrics import LogMetrics
+from spine_aws_common.log.sinks import StdoutSink
+from spine_aws_common.log.suppression import LogSuppressor
+from spine_aws_common.log.truncation import cap_fields, cap_text
+
+
+# pylint: disable=too-many-instance-attributes
+class LogEngine:
+    """
+    Write logs from a log catalog to a log sink, ready for splunk in the same
+    way as Spine applications. Where the sink adds its own timestamp (as
+    Python logging does) timestamps should be False.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def __init__(
+        self,
+        log_catalog,
+        process_name="ANON",
+        severity_threshold="INFO",
+        internal_id=None,
+        log_sink=None,
+        background_writer=None,
+        output_format=LoggingConstants.OUTPUT_TEXT,
+        invocation_byte_budget=None,
+        aggregated_references=None,
+        collect_metrics=False,
+        timestamps=True,
+        deduplicate_crashdumps=False,
+        max_traceback_length=DEFAULT_MAX_TRACEBACK_LENGTH,
+        severity_overrides=None,
+        max_field_bytes=None,
+        max_line_bytes=None,
+    ):
+        self._log_catalog = log_catalog
+
+        self.process_name = process_name
+        self.internal_id = internal_id
+        self.severity_threshold = severity_threshold
+        self.severity_threshold_value = level_value(severity_threshold)
+        self.date_format = "%d/%m/%Y %H:%M:%S"
+        self.timestamps = timestamps
+        self.log_sink = log_sink or StdoutSink()
+        self.background_writer = background_writer
+        if output_format not in (LoggingConstants.OUTPUT_TEXT, LoggingConstants.OUTPUT_JSON):
+            raise ValueError(f"Unknown log output format {output_format}")
+        self.json_output = output_format == LoggingConstants.OUTPUT_JSON
+        # Substitutions are capped once masked, before rendering. Only text lines
+        # are capped as a whole, as cutting JSON would leave it unparseable.
+        self.max_field_bytes = max_field_bytes
+        self.max_line_bytes = None if self.json_output else max_line_bytes
+
+        # Only pay for suppression checks when something could be suppressed
+        self._suppressor = None
+        if invocation_byte_budget is not None or self._log_catalog.has_limits:
+            self._suppressor = LogSuppressor(invocation_byte_budget)
+        self._aggregator = LogAggregator(aggregated_references) if aggregated_references else None
+        self._metrics = LogMetrics() if collect_metrics else None
+        self.max_traceback_length = max_traceback_length
+        self._crashdumps = CrashdumpDeduplicator(max_traceback_length) if deduplicate_crashdumps else None
+        # Only the overrides in use are consulted, so an empty table costs nothing
+        self.severity_overrides = severity_overrides
+        self._severity_overrides = None
+        self.refresh_severity_overrides()
+
+        # The current second with its timestamp text, and preamble text
+        # following the timestamp for each (log_level, log_reference) under the
+        # current process name and internal ID
+        self._timestamp = (None, None)
+        self._preamble_prefixes = {}
+        self._preamble_prefix_owner = (process_name, internal_id)
+
+    def set_internal_id(self, internal_id):
+        """Set internal ID"""
+        self.internal_id = internal_id
+        self._preamble_prefixes = {}
+
+    def bind(self, **fields):
+        """
+        A lightweight child logger with the fields bound to it, see BoundLogger.
+        An internalID field is written in the preamble in place of the
+        logger's internal ID.
+        """
+        return BoundLogger(self, fields)
+
+    def current_internal_id(self):
+        """The internal ID lines are written with in the current context"""
+        binding = self._current_binding()
+        if binding is not None:
+            return binding.internal_id or self.internal_id
+        return self.internal_id
+
+    def set_process_name(self, process_name):
+        """Set process name"""
+        self.process_name = process_name
+        self._preamble_prefixes = {}
+
+    def refresh_severity_overrides(self):
+        """
+        Load the severity overrides again from their source, if their TTL has
+        passed
+        """
+        if self.severity_overrides is None:
+            return
+        self.severity_overrides.refresh()
+        self._severity_overrides = self.severity_overrides if self.severity_overrides else None
+
+    def flush(self):
+        """
+        Write out any log lines still queued for the background writer or
+        held back by the log sink
+        """
+        if self.background_writer:
+            self.background_writer.drain()
+        self.log_sink.flush()
+
+    def write_suppression_summary(self):
+        """
+        Write a single line summarising the log lines suppressed by sampling,
+        rate limits or the byte budget during this invocation, and start
+        counting afresh for the next
+        """
+        if self._suppressor is None:
+            return
+        if self.background_writer:
+            # Lines still queued count towards the byte budget
+            self.background_writer.drain()
+        summary = self._suppressor.reset()
+        if summary["suppressed_lines"]:
+            self.write_log(LoggingConstants.LR_SUPPRESSED, None, summary)
+
+    def reset_crashdump_fingerprints(self):
+        """
+        Forget the crashdumps written during this invocation, so the next
+        invocation writes each in full again
+        """
+        if self._crashdumps is None:
+            return
+        if self.background_writer:
+            self.background_writer.drain()
+        self._crashdumps.reset()
+
+    def write_aggregated_logs(self):
+        """
+        Write a single line for each distinct line aggregated during this
+        invocation, with the number of occurrences and when the first and last
+        were logged
+        """
+        if self._aggregator is None:
+            return
+        for aggregated_log in self._aggregator.reset():
+            log_details = self._log_catalog.get(aggregated_log.log_reference)
+            log_template = log_details.log_template
+            substitution_dict = aggregated_log.substitutions
+            if aggregated_log.occurrences > 1:
+                log_template = self._aggregator.template(aggregated_log.log_reference, log_details.log_text)
+                substitution_dict = dict(
+                    substitution_dict,
+                    occurrences=aggregated_log.occurrences,
+                    firstLogged=self._create_log_timestamp(aggregated_log.first_logged),
+                    lastLogged=self._create_log_timestamp(aggregated_log.last_logged),
+                )
+            log_preamble = self._create_log_preamble(
+                aggregated_log.first_logged,
+                log_details.log_level,
+                aggregated_log.process_name,
+                aggregated_log.log_reference,
+                aggregated_log.internal_id,
+            )
+            self._write(log_preamble, log_template, substitution_dict, LoggingConstants.LFR_OPERATIONS)
+            if log_details.monitor_log_required:
+                self._write(
+                    substitute_preamble_for_monitor(log_preamble),
+                    log_template,
+                    substitution_dict,
+                    LoggingConstants.LFR_NMS,
+                )
+
+    def is_enabled(self, log_reference, severity_threshold_override=None):
+        """
+        Check whether a log reference would be written at the current severity
+        threshold, so callers can skip building expensive log parameters
+        """
+        if severity_threshold_override:
+            return self._log_catalog.get(log_reference).is_logged(level_value(severity_threshold_override))
+        severity_threshold_value = self.severity_threshold_value
+        if self._severity_overrides is not None:
+            severity_threshold_value = self._severity_overrides.threshold_value(
+                log_reference, self.process_name, severity_threshold_value
+            )
+        return self._log_catalog.get(log_reference).is_logged(severity_threshold_value)
+
+    def write_log(
+        self,
+        log_reference="UTI9999",
+        error_list=None,
+        log_row_dict=None,
+        severity_threshold_override=None,
+        process_name=None,
+    ):
+        """
+        The writing of the log allows the following information to be passed:
+        :param log_reference: this should resolve to a log_reference within the logBase
+        :type  log_reference: str
+        :param error_list: the output of a sys.exc_info() where an exception has been
+        caught
+        :param log_row_dict - a dictionary of substitutions to be made against the
+        logText in the log_reference. Values may be zero-argument callables, which
+        are only evaluated if the log is to be written
+        :type log_row_dict: dict
+        :param severity_threshold_override: Not normally present - allows the standard
+        log level to be over-ridden for this entry
+        :param process_name: Not normally present - allows the standard process_name to
+        be over-ridden for this entry
+        Without a severity_threshold_override, any runtime severity override for
+        the log reference or process is used in place of the severity threshold
+        The process for writing a log file entry is:
+        Lookup the log reference information in the log base
+        Exit out if the log level of the log is above that at which the user is set
+        to log (e.g. if it is a DEBUG log and the user level is set to INFO)
+        Create an audit version of the log_row_dict containing sensitive data, and
+        determine if an Audit entry is required
+        Drop the entry if it is sampled out, rate limited or over the byte budget
+        """
+        return self._write_log(
+            self._current_binding(), log_reference, error_list, log_row_dict, severity_threshold_override, process_name
+        )
+
+    def _current_binding(self):
+        """The binding of this logger in the current context, if any"""
+        binding = CURRENT_BINDING.get()
+        if binding is not None and binding.log_object is not self:
+            return None
+        return binding
+
+    def _write_log(
+        self,
+        binding,
+        log_reference="UTI9999",
+        error_list=None,
+        log_row_dict=None,
+        severity_threshold_override=None,
+        process_name=None,
+    ):
+        """
+        Write the log as write_log, with the given binding's fields. Bound
+        loggers pass their binding directly rather than through the context.
+        """
+        # pylint:disable=too-many-arguments
+        if log_row_dict is None:
+            log_row_dict = {}
+
+        if process_name is None:
+            process_name = self.process_name
+
+        if not self._log_catalog:
+            self._print_output(process_name, log_reference, log_row_dict, error_list)
+            return None
+
+        if severity_threshold_override:
+            severity_threshold_value = level_value(severity_threshold_override)
+        else:
+            severity_threshold_value = self.severity_threshold_value
+            if self._severity_overrides is not None:
+                severity_threshold_value = self._severity_overrides.threshold_value(
+                    log_reference, process_name, severity_threshold_value
+                )
+
+        log_details = self._log_catalog.get(log_reference)
+        if not log_details.is_logged(severity_threshold_value):
+            if self._metrics is not None:
+                self._metrics.below_threshold += 1
+            return None
+
+        return self._write_log_details(
+            log_reference, log_details, error_list, log_row_dict, severity_threshold_value, process_name, binding
+        )
+
+    def write_logs(self, log_reference, rows, severity_threshold_override=None, process_name=None):
+        """
+        Write the same log reference once for each row of substitutions, e.g.
+        the outcome of each record in a batch. The log reference, severity
+        threshold and preamble are resolved once, and the lines written to
+        the log sink together, but each line is the same as write_log would
+        write for its row. Rows may be any iterable, e.g. a generator.
+        """
+        return self._write_logs(self._current_binding(), log_reference, rows, severity_threshold_override, process_name)
+
+    def _write_logs(self, binding, log_reference, rows, severity_threshold_override=None, process_name=None):
+        """Write the logs as write_logs, with the given binding's fields"""
+        # pylint:disable=too-many-arguments
+        if process_name is None:
+            process_name = self.process_name
+
+        if not self._log_catalog:
+            for log_row_dict in rows:
+                self._print_output(process_name, log_reference, log_row_dict, None)
+            return None
+
+        if severity_threshold_override:
+            severity_threshold_value = level_value(severity_threshold_override)
+        else:
+            severity_threshold_value = self.severity_threshold_value
+            if self._severity_overrides is not None:
+                severity_threshold_value = self._severity_overrides.threshold_value(
+                    log_reference, process_name, severity_threshold_value
+                )
+
+        log_details = self._log_catalog.get(log_reference)
+        if not log_details.is_logged(severity_threshold_value):
+            if self._metrics is not None:
+                # Rows may be any iterable, so count them rather than take len()
+                self._metrics.below_threshold += sum(1 for _ in rows)
+            return None
+
+        line_batch = []
+        try:
+            for log_row_dict in rows:
+                self._write_log_details(
+                    log_reference,
+                    log_details,
+                    None,
+                    {} if log_row_dict is None else log_row_dict,
+                    severity_threshold_value,
+                    process_name,
+                    binding,
+                    line_batch,
+                )
+        finally:
+            if line_batch:
+                self._write_batch(line_batch)
+        return log_details.log_text
+
+    def write_log_with_metrics(self, log_reference, error_list=None, log_row_dict=None):
+        """
+        Write the log with the logging metrics for the invocation as extra
+        fields, starting the metrics afresh. Without metrics being collected
+        this is the same as write_log.
+        """
+        return self._write_log_with_metrics(self._current_binding(), log_reference, error_list, log_row_dict)
+
+    def _write_log_with_metrics(self, binding, log_reference, error_list=None, log_row_dict=None):
+        """Write the log as write_log_with_metrics, with the given binding's fields"""
+        if self._metrics is None:
+            return self._write_log(binding, log_reference, error_list, log_row_dict)
+
+        if self.background_writer:
+            # Lines still queued are rendered and written on the writer thread
+            self.background_writer.drain()
+        metrics_fields = self._metrics.report()
+        log_details = self._log_catalog.get_with_fields(log_reference, tuple(metrics_fields))
+        # Honour runtime severity overrides as write_log does
+        severity_threshold_value = self.severity_threshold_value
+        if self._severity_overrides is not None:
+            severity_threshold_value = self._severity_overrides.threshold_value(
+                log_reference, self.process_name, severity_threshold_value
+            )
+        if not log_details.is_logged(severity_threshold_value):
+            return None
+        log_row_dict = dict(log_row_dict or {}, **metrics_fields)
+        return self._write_log_details(
+            log_reference,
+            log_details,
+            error_list,
+            log_row_dict,
+            severity_threshold_value,
+            self.process_name,
+            binding,
+        )
+
+    def _write_log_details(
+        self,
+        log_reference,
+        log_details,
+        error_list,
+        log_row_dict,
+        severity_threshold_value,
+        process_name,
+        binding,
+        line_batch=None,
+    ):
+        """
+        Write the log once its details have been found and it is known to be
+        at or above the severity threshold, with the internal ID of any fields
+        bound in the current context. Lines without an error are rendered into
+        line_batch to be written together, if one is given.
+        """
+        # pylint:disable=too-many-arguments,too-many-locals,too-many-branches
+        resolve_lazy_values(log_row_dict)
+        if binding is None:
+            # If not provided, set empty values for internalID and sessionId
+            add_default_keys(log_row_dict)
+            audit_log_required = evaluate_log_keys(log_row_dict) or log_details.audit_log_required
+        else:
+            # The bound fields were evaluated when bound, so only the rest need to be
+            audit_log_required = (
+                evaluate_log_keys(log_row_dict) or binding.audit_log_required or log_details.audit_log_required
+            )
+            log_row_dict = {**binding.fields, **log_row_dict}
+        crashdump_required = LogDetails.is_crashdump_required(severity_threshold_value, error_list)
+
+        # Audit and crashdump lines are always written individually
+        protected = audit_log_required or crashdump_required or log_details.log_value == LoggingConstants.AUDIT
+
+        if self._suppressor is not None and not self._suppressor.allow(log_reference, log_details, protected):
+            return None
+
+        internal_id = self.internal_id if binding is None else binding.internal_id or self.internal_id
+        time_now = datetime.datetime.now()
+        metrics = self._metrics
+        if metrics is not None:
+            mask_start = time.perf_counter()
+        if self.json_output:
+            # Every substitution is output, not only those in the log text
+            log_row_dict_masked = mask_url(log_row_dict, self._log_catalog.masked_keys)
+        else:
+            log_row_dict_masked = apply_masking_plan(log_details.masking_plan, log_row_dict)
+        if metrics is not None:
+            metrics.mask_time += time.perf_counter() - mask_start
+        if self.max_field_bytes is not None:
+            # Capped only once masked, as a cut through an identifier would
+            # stop it being recognised and leave part of it in clear
+            log_row_dict_masked = cap_fields(log_row_dict_masked, self.max_field_bytes)
+
+        if (
+            self._aggregator is not None
+            and not protected
+            and log_reference in self._aggregator
+            and self._aggregator.add(log_reference, process_name, internal_id, log_row_dict_masked, time_now)
+        ):
+            return log_details.log_text
+
+        log_preamble = self._create_log_preamble(
+            time_now, log_details.log_level, process_name, log_reference, internal_id, binding
+        )
+
+        if audit_log_required:
+            self._write(
+                log_preamble,
+                log_details.log_template,
+                log_row_dict_masked,
+                LoggingConstants.LFR_AUDIT,
+                line_batch=line_batch,
+            )
+        else:
+            self._write(
+                log_preamble,
+                log_details.log_template,
+                log_row_dict_masked,
+                LoggingConstants.LFR_OPERATIONS,
+                line_batch=line_batch,
+            )
+
+        if log_details.monitor_log_required:
+            # Swap to Log_Level=MONITOR - will help prevent SALTing requirement
+            # As Splunk may get matching CRC check for Audit and Monitor Log
+            self._write(
+                substitute_preamble_for_monitor(log_preamble),
+                log_details.log_template,
+                log_row_dict_masked,
+                LoggingConstants.LFR_NMS,
+                line_batch=line_batch,
+            )
+
+        if crashdump_required:
+            stub_log_reference = LoggingConstants.LR_CRASHDUMP
+            stub_log_details = self._log_catalog.get(stub_log_reference)
+            stub_log_preamble = self._create_log_preamble(
+                time_now, stub_log_details.log_level, process_name, stub_log_reference, internal_id, binding
+            )
+
+            # Write stub crashdump to spinevfmoperations, so that non-SC cleared staff
+            # can see a crash occurred
+            self._write(
+                stub_log_preamble,
+                stub_log_details.log_template,
+                {"originalLogReference": log_reference},
+                LoggingConstants.LFR_OPERATIONS,
+            )
+
+            # Write actual crashdump to spinevfmcrashdump
+            self._write(
+                log_preamble,
+                log_details.log_template,
+                log_row_dict,
+                LoggingConstants.LFR_CRASHDUMP,
+                error_list,
+            )
+
+        return log_details.log_text
+
+    @staticmethod
+    def _print_output(process_name, log_reference, log_row_dict, error_list):
+        """
+        Print out error details as no log object
+        """
+        print_string = process_name + ": Log Reference of " + str(log_reference)
+        print_string += " raised but insufficient logging details"
+        print_string += " identified to write to file."
+        print(print_string)
+        print("Error details " + str(error_list))
+        print("Log Parameters " + str(log_row_dict))
+
+    def _create_log_timestamp(self, time_now):
+        """
+        Creates the timestamp text, only formatting the date and time once per
+        second and appending the milliseconds
+        """
+        second = (time_now.second, time_now.minute, time_now.hour, time_now.day, time_now.month, time_now.year)
+        # Read and replaced as one tuple, so another thread never sees the
+        # text of one second paired with a different second
+        timestamp_second, timestamp_text = self._timestamp
+        if second != timestamp_second:
+            timestamp_text = time_now.strftime(self.date_format) + "."
+            self._timestamp = (second, timestamp_text)
+        return timestamp_text + f"{time_now.microsecond // 1000:03d}"
+
+    def _create_preamble_prefix(self, log_level, process_name, log_reference, internal_id, binding=None):
+        """
+        Creates the part of the preamble following the timestamp, cached while
+        the process name and internal ID are unchanged, or for the lifetime of
+        the fields bound in the current context
+        """
+        # pylint:disable=too-many-arguments
+        if binding is not None:
+            prefix_key = (log_level, log_reference, process_name, internal_id)
+            prefix = binding.preamble_prefixes.get(prefix_key)
+            if prefix is None:
+                prefix = self._create_preamble_prefix(log_level, process_name, log_reference, internal_id)
+                binding.preamble_prefixes[prefix_key] = prefix
+            return prefix
+
+        cacheable = process_name is self.process_name and internal_id is self.internal_id
+        if cacheable:
+            owner = self._preamble_prefix_owner
+            if owner[0] is not process_name or owner[1] is not self.internal_id:
+                self._preamble_prefixes = {}
+                self._preamble_prefix_owner = (process_name, self.internal_id)
+            prefix = self._preamble_prefixes.get((log_level, log_reference))
+            if prefix is not None:
+                return prefix
+
+        prefix = " Log_Level=" + log_level + " Process=" + str(process_name)
+        if internal_id:
+            prefix = prefix + " internalID=" + internal_id
+        prefix = prefix + " logReference=" + str(log_reference)
+
+        if cacheable:
+            self._preamble_prefixes[(log_level, log_reference)] = prefix
+        return prefix
+
+    def _create_log_preamble(self, time_now, log_level, process_name, log_reference, internal_id, binding=None):
+        """
+        Creates the string to form the initial part of any log message, or the
+        dictionary of preamble fields for JSON output
+        """
+        # pylint:disable=too-many-arguments
+        if not self.timestamps:
+            # The log sink adds the timestamp itself
+            if self.json_output:
+                return create_json_preamble(None, log_level, process_name, internal_id, log_reference)
+            return self._create_preamble_prefix(log_level, process_name, log_reference, internal_id, binding)[1:]
+
+        log_timestamp_string = self._create_log_timestamp(time_now)
+
+        if self.json_output:
+            return create_json_preamble(log_timestamp_string, log_level, process_name, internal_id, log_reference)
+
+        return log_timestamp_string + self._create_preamble_prefix(
+            log_level, process_name, log_reference, internal_id, binding
+        )
+
+    def _write(self, log_preamble, log_text, substitution_dict, log_type, error_list=None, line_batch=None):
+        """
+        Write the log inline, or hand it to the background writer to render
+        and write if one is configured, or render it into the line batch
+        """
+        # pylint:disable=too-many-arguments
+        if line_batch is not None and not self.background_writer:
+            self._render_to_batch(line_batch, log_preamble, log_text, substitution_dict, log_type)
+            return
+
+        if log_type == LoggingConstants.LFR_CRASHDUMP and self.log_sink.formats_exceptions:
+            write_function = self._write_crashdump_to_sink
+        elif self._metrics is None:
+            write_function = self._write_to_sink
+        else:
+            write_function = self._write_to_sink_with_metrics
+
+        if self.background_writer:
+            # Copy the substitutions as the caller is free to change them once
+            # write_log returns
+            self.background_writer.submit(
+                write_function, log_preamble, log_text, dict(substitution_dict), log_type, error_list
+            )
+        else:
+            write_function(log_preamble, log_text, substitution_dict, log_type, error_list)
+
+    def _render_to_batch(self, line_batch, log_preamble, log_text, substitution_dict, log_type):
+        """
+        Renders the log into the line batch as (log_line, log_type), to be
+        written with the rest of the batch
+        """
+        # pylint:disable=too-many-arguments
+        if self._metrics is not None:
+            start = time.perf_counter()
+        log_lines = self._render(log_preamble, log_text, substitution_dict, log_type, None)
+        for log_line in log_lines:
+            line_batch.append((log_line, log_type))
+            if self._suppressor is not None:
+                self._suppressor.record_bytes(log_line)
+        if self._metrics is not None:
+            self._metrics.record_write(log_type, log_lines, time.perf_counter() - start, 0.0)
+
+    def _write_batch(self, line_batch):
+        """Write the lines of a batch to the log sink, in one write if it can"""
+        if self._metrics is not None:
+            start = time.perf_counter()
+        write_lines = getattr(self.log_sink, "write_lines", None)
+        if write_lines is not None:
+            write_lines(line_batch)
+        else:
+            for log_line, log_type in line_batch:
+                self.log_sink.write(log_line, log_type)
+        if self._metrics is not None:
+            self._metrics.write_time += time.perf_counter() - start
+
+    def _write_to_sink(
+        self,
+        log_preamble,
+        log_text,
+        substitution_dict,
+        log_type,
+        error_list=None,
+    ):
+        """
+        Writes the log out to the log sink, by default standard out for
+        Cloudwatch logging
+        """
+        for log_line in self._render(log_preamble, log_text, substitution_dict, log_type, error_list):
+            self.log_sink.write(log_line, log_type)
+            if self._suppressor is not None:
+                self._suppressor.record_bytes(log_line)
+
+    def _write_to_sink_with_metrics(self, log_preamble, log_text, substitution_dict, log_type, error_list=None):
+        """
+        Writes the log out as _write_to_sink, timing the rendering and
+        writing
+        """
+        # pylint:disable=too-many-arguments
+        start = time.perf_counter()
+        log_lines = self._render(log_preamble, log_text, substitution_dict, log_type, error_list)
+        rendered = time.perf_counter()
+        for log_line in log_lines:
+            self.log_sink.write(log_line, log_type)
+            if self._suppressor is not None:
+                self._suppressor.record_bytes(log_line)
+        self._metrics.record_write(log_type, log_lines, rendered - start, time.perf_counter() - rendered)
+
+    def _write_crashdump_to_sink(self, log_preamble, log_text, substitution_dict, log_type, error_list=None):
+        """
+        Writes the crashdump to a log sink which formats the traceback itself,
+        as Python logging does
+        """
+        # pylint:disable=too-many-arguments
+        exc_info = None
+        repeat_text = None
+        if error_list and len(error_list) >= 3:
+            exc_info = tuple(error_list[0:3])
+            if self._crashdumps is not None:
+                formatted_exception, first_occurrence = self._crashdumps.format(error_list)
+                if not first_occurrence:
+                    # Only refer back to the traceback the sink has already formatted
+                    exc_info = None
+                    repeat_text = formatted_exception
+
+        if self.json_output:
+            log_line = create_json_log_line(
+                log_preamble, log_text, substitution_dict, error_list, repeat_text, self._log_catalog.masked_keys
+            )
+        else:
+            log_line = create_log_line(log_preamble, log_text, substitution_dict, self._log_catalog.masked_keys)
+            if error_list is not None:
+                log_line = log_line + " - " + str(error_list[0:])
+            if repeat_text is not None:
+                log_line = log_line + " - " + repeat_text
+            if self.max_line_bytes is not None:
+                log_line = cap_text(log_line, self.max_line_bytes)
+        self.log_sink.write(log_line, log_type, exc_info=exc_info)
+
+        if self._suppressor is not None:
+            self._suppressor.record_bytes(log_line)
+        if self._metrics is not None:
+            self._metrics.record_write(log_type, (log_line,), 0.0, 0.0)
+
+    def _render(self, log_preamble, log_text, substitution_dict, log_type, error_list):
+        """
+        Renders the log lines to write. A crashdump traceback is written on a
+        second line, or for JSON output held in the same object, and repeats
+        of a crashdump are only referred to when deduplicating. Text lines are
+        capped at max_line_bytes.
+        """
+        # pylint:disable=too-many-arguments
+        formatted_exception = None
+        if log_type == LoggingConstants.LFR_CRASHDUMP and error_list and len(error_list) >= 3:
+            if self._crashdumps is None:
+                formatted_exception = format_exception(error_list, self.max_traceback_length)
+            else:
+                formatted_exception, _ = self._crashdumps.format(error_list)
+
+        if self.json_output:
+            return (
+                create_json_log_line(
+                    log_preamble,
+                    log_text,
+                    substitution_dict,
+                    error_list,
+                    formatted_exception,
+                    self._log_catalog.masked_keys,
+                ),
+            )
+
+        log_line = create_log_line(log_preamble, log_text, substitution_dict, self._log_catalog.masked_keys)
+        if error_list is not None:
+            log_line = log_line + " - " + str(error_list[0:])
+        if formatted_exception is None:
+            if self.max_line_bytes is not None:
+                return (cap_text(log_line, self.max_line_bytes),)
+            return (log_line,)
+        exception_line = create_log_line(log_preamble, formatted_exception, {})
+        if self.max_line_bytes is not None:
+            return (cap_text(log_line, self.max_line_bytes), cap_text(exception_line, self.max_line_bytes))
+        return (log_line, exception_line)
@@ -1,16 +1,20 @@
 """
 Created 18th June 2019
 """
-import re
+import string
 
 import six
 
-from spine_aws_common.log.loglineprocessor import LogLineProcessor, check_for_param_dictionary
+from spine_aws_common.log.loglineprocessor import check_for_param_dictionary, requires_audit
+from spine_aws_common.log.masking import mask_url
 
 NOT_PROVIDED = "NotProvided"
 
 DEFAULT_KEYS = ["internalID", "sessionid"]
 
+_FORMATTER = string.Formatter()
+_CONVERSIONS = {"s": str, "r": repr, "a": ascii}
+
 
 def _default_key(log_row_dict, key, value):
     """
@@ -21,17 +25,6 @@ def _default_key(log_row_dict, key, value):
         log_row_dict[key] = value
 
 
-def _substitute_if_empty(value):
-    """
-    Splunk SDK version being used doesn't handle empty text nodes efficiently
-    when parsing the results of a splunk query. This method substitutes any
-    empty strings with text NotProvided.
-    """
-    if isinstance(value, six.string_types) and not value.strip():
-        return NOT_PROVIDED
-    return value
-
-
 def add_default_keys(log_row_dict):
     """
     Add any default keys
@@ -40,6 +33,17 @@ def add_default_keys(log_row_dict):
         _default_key(log_row_dict, key, "")
 
 
+def resolve_lazy_values(log_row_dict):
+    """
+    Replace any zero-argument callables with the value they return, so that
+    expensive values are only evaluated when the log will be written.
+    Classes are callable but are logged as they are.
+    """
+    for key, value in log_row_dict.items():
+        if callable(value) and not isinstance(value, type):
+            log_row_dict[key] = value()
+
+
 def create_log_preamble(log_level, process_name, log_reference):
     """Creates the string to form the initial part of any log message"""
     return f"Log_Level={log_level} Process={process_name} logReference={log_reference}"
@@ -66,47 +70,145 @@ def _decode_unicode_dictionary(substitution_dict):
     return decode_dict
 
 
-def evaluate_log_keys(log_details, log_row_dict):
-    """
-    Evaulate each log key to ensure no empty logs slip through
+def evaluate_log_keys(log_row_dict):
+    """
+    Evaulate each log key to ensure no empty logs slip through.
+    Returns True if any key holds sensitive data so an audit entry is required.
+    """
+    audit_log_required = False
+    for log_key, value in log_row_dict.items():
+        if not audit_log_required:
+            audit_log_required = requires_audit(log_key, value) or check_for_param_dictionary(value)
+
+        # Splunk SDK version being used doesn't handle empty text nodes
+        # efficiently when parsing the results of a splunk query, so empty
+        # strings are substituted with text NotProvided.
+        if isinstance(value, six.string_types) and not value.strip():
+            log_row_dict[log_key] = NOT_PROVIDED
+
+    return audit_log_required
+
+
+def _remove_newlines(text):
+    """
+    Replace newlines with spaces, only paying for the substitution where
+    there is a newline to replace
+    """
+    if "\n" in text or "\r" in text:
+        return text.replace("\n", " ").replace("\r", " ")
+    return text
+
+
+class LogTemplate:
+    """
+    Log text parsed once into literal text and substitution fields, so that
+    rendering a log line is a simple join without re-parsing the log text.
+    Templates which can't be rendered field by field (positional, attribute
+    or index fields, or invalid format strings) fall back to str.format.
+    """
+
+    __slots__ = ("log_text", "field_names", "error", "_parts")
+
+    def __init__(self, log_text):
+        self.log_text = log_text
+        self.error = None
+        self._parts = None
+        field_names = []
+        try:
+            parts = []
+            for literal, field_name, format_spec, conversion in _FORMATTER.parse(log_text):
+                if field_name is not None:
+                    if not field_name.isidentifier() or "{" in format_spec:
+                        # Not a plain keyword field - leave to str.format
+                        parts = None
+                    field_names.append(field_name)
+                if parts is not None:
+                    parts.append((_remove_newlines(literal), field_name, format_spec, _CONVERSIONS.get(conversion)))
+            self._parts = tuple(parts) if parts is not None else None
+        except ValueError as err:
+            self.error = str(err)
+        self.field_names = tuple(dict.fromkeys(field_names))
+
+    def __repr__(self):
+        return f"LogTemplate({self.log_text!r})"
+
+    def render(self, substitution_dict):
+        """
+        Render the template, with newlines in the substituted values replaced.
+        Raises KeyError for the first missing key in the same way as str.format
+        """
+        if self._parts is None:
+            return _remove_newlines(self.log_text.format(**substitution_dict))
+
+        rendered = []
+        append = rendered.append
+        for literal, field_name, format_spec, conversion in self._parts:
+            append(literal)
+            if field_name is None:
+                continue
+            value = substitution_dict[field_name]
+            if conversion is not None:
+                value = conversion(value)
+            if format_spec or value.__class__ is not str:
+                value = format(value, format_spec)
+            append(value)
+        # Literal text has already had newlines replaced, so any newline found
+        # here must have come from a substituted value
+        return _remove_newlines("".join(rendered))
+
+
+def render_log_text(log_text, substitution_dict, log_preamble="", masked_keys=None):
+    """
+    Render the log text, catching error scenarios (unicode and missing terms in
+    dictionary) and ensuring everything fits on a single line.
+    The log text may be a raw format string or a pre-parsed LogTemplate. The
+    preamble is only used to identify the log when substitution fails. As the
+    whole dictionary is then output, every key in masked_keys is masked first,
+    not only those the log text uses.
     """
-    for log_key in log_row_dict:
-        audit = check_for_param_dictionary(log_row_dict[log_key])
-        log_details.audit_log_required = audit or log_details.audit_log_required
+    if isinstance(log_text, LogTemplate):
+        try:
+            return log_text.render(substitution_dict)
+        except (KeyError, UnicodeError):
+            log_text = log_text.log_text
 
-        audit = LogLineProcessor().process(log_key, log_row_dict[log_key])
-        log_details.audit_log_required = audit or log_details.audit_log_required
+    try:
+        rendered_text = log_text.format(**substitution_dict)
+    except KeyError as err:
+        rendered_text = log_text + " - "
+        rendered_text += "No substitution due to KeyError, missing keys: "
+        rendered_text += str(list(err.args))
+        rendered_text += ", dictionary of "
+        rendered_text += str(mask_url(substitution_dict, masked_keys))
+        print("Substitution failure - fail build: " + log_preamble + " - " + rendered_text)
+    except UnicodeError:
+        decode_dict = _decode_unicode_dictionary(substitution_dict)
+        rendered_text = log_text.format(**decode_dict)
 
-        log_row_dict[log_key] = _substitute_if_empty(log_row_dict[log_key])
+    # Replace newlines with spaces
+    return _remove_newlines(rendered_text)
 
 
-def create_log_line(log_preamble, log_text, substitution_dict):
+def create_log_line(log_preamble, log_text, substitution_dict, masked_keys=None):
     """
     Write a log line, catching error scenarios (unicode and missing terms in
     dictionary) and ensuring everything fits on a single line.
+    The log text may be a raw format string or a pre-parsed LogTemplate.
     """
-    try:
-        log_line = log_preamble + " - " + log_text.format(**substitution_dict)
-    except KeyError as err:
-        log_line = log_preamble + " - " + log_text + " - "
-        log_line += "No substitution due to KeyError, missing keys: "
-        log_line += str(list(err.args))
-        log_line += ", dictionary of "
-        log_line += str(substitution_dict)
-        print("Substitution failure - fail build: " + log_line)
-    except UnicodeError:
-        decode_dict = _decode_unicode_dictionary(substitution_dict)
-        log_line = log_preamble + " - " + log_text.format(**decode_dict)
-
-    # Replace newlines with spaces
-    log_line = re.sub(r"\n|\r", " ", log_line)
-    return log_line
+    return _remove_newlines(log_preamble) + " - " + render_log_text(
+        log_text, substitution_dict, log_preamble, masked_keys
+    )
 
 
 def substitute_preamble_for_monitor(log_preamble):
     """
-    Switch the Log Level for the monitor version of info/audit log
+    Switch the Log Level for the monitor version of info/audit log.
+    The preamble may be text or, for JSON output, a dictionary of fields.
     """
+    if isinstance(log_preamble, dict):
+        if log_preamble.get("Log_Level") in ("AUDIT", "INFO"):
+            return dict(log_preamble, Log_Level="MONITOR")
+        return log_preamble
     if "Log_Level=AUDIT" in log_preamble:
         return log_preamble.replace("Log_Level=AUDIT", "Log_Level=MONITOR")
     if "Log_Level=INFO" in log_preamble:
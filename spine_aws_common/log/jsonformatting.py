@@ -0,0 +1,50 @@
+"""
+JSON line output, so log fields can be indexed without being parsed back out
+of the key=value text
+"""
+import json
+
+from spine_aws_common.log.formatting import render_log_text
+
+# A single encoder is reused for every line. Anything which isn't natively
+# serialisable is written using its string form, as it would be in the text
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def create_json_preamble(log_timestamp, log_level, process_name, internal_id, log_reference):
+    """
+    Creates the dictionary of fields forming the initial part of any log message
+    """
+    # pylint:disable=too-many-arguments
+    log_preamble = {"timestamp": log_timestamp} if log_timestamp else {}
+    log_preamble["Log_Level"] = log_level
+    log_preamble["Process"] = str(process_name)
+    if internal_id:
+        log_preamble["internalID"] = internal_id
+    log_preamble["logReference"] = str(log_reference)
+    return log_preamble
+
+
+def create_json_log_line(
+    log_preamble, log_text, substitution_dict, error_list=None, formatted_exception=None, masked_keys=None
+):
+    """
+    Write a log line as a single JSON object holding the preamble fields, the
+    rendered log text and the substitutions
+    """
+    # pylint:disable=too-many-arguments
+    log_object = dict(log_preamble)
+    log_object["message"] = render_log_text(
+        log_text, substitution_dict, log_preamble.get("logReference", ""), masked_keys
+    )
+    log_object["fields"] = substitution_dict
+    if error_list is not None:
+        log_object["error"] = str(error_list[0:])
+    if formatted_exception is not None:
+        log_object["exception"] = formatted_exception
+    try:
+        return _ENCODER.encode(log_object)
+    except ValueError:
+        # A value refers to itself, so write the fields as they would be in the text
+        log_object["fields"] = str(substitution_dict)
+        return _ENCODER.encode(log_object)
@@ -0,0 +1,37 @@
+"""
+Command line compilation of log base cfg files, kept apart from
+compiledlogbase as that is already imported by the package when run with -m
+"""
+import argparse
+import sys
+
+from spine_aws_common.log.compiledlogbase import COMPILED_SUFFIX, compile_log_base
+
+
+def main(argv=None):
+    """
+    Compile each log base cfg file given on the command line to its own
+    compiled file, as each of the log base and additional log config is
+    loaded on its own
+    """
+    parser = argparse.ArgumentParser(description="Compile log base cfg files for faster cold starts")
+    parser.add_argument("log_base", nargs="+", help="log base cfg files, each compiled alongside itself")
+    parser.add_argument(
+        "-o", "--output", help=f"compiled file for a single cfg file, defaults to the cfg file plus {COMPILED_SUFFIX}"
+    )
+    args = parser.parse_args(argv)
+    if args.output and len(args.log_base) > 1:
+        parser.error("--output can only be given with a single cfg file")
+
+    result = 0
+    for log_base in args.log_base:
+        output_path = compile_log_base(log_base, args.output)
+        if output_path is None:
+            result = 1
+        else:
+            print(f"Compiled {output_path}")
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,37 @@
 """
 Created 18th June 2019
 """
+from functools import lru_cache
 from urllib.parse import parse_qs, urlsplit
 
+# Keys which hold patient identifiable data, so the log must go to audit.
+# Force all keys to lower - they are compared against key.lower()
+PID_REFERENCES = frozenset(
+    x.lower()
+    for x in [
+        "nhsNumber",
+        "successorNhsNumber",
+        "motherNhsNumber",
+        "babyNhsNumber",
+        # The following lines are output in Demographics Trace Logging
+        "queryLine",
+        "givenName",
+        "familyName",
+        # The following lines are output in CPIS Logging.
+        "authIdentityNo",
+        "laCode",
+        "laName",
+        "cpoType",
+    ]
+)
+
+# Keys holding URLs, which need their query parameters checking for PID
+URL_KEYS = frozenset(x.lower() for x in ["url", "requestUrl"])
+
+_NOT_SENSITIVE = 0
+_PID_KEY = 1
+_URL_KEY = 2
+
 
 class LogLineProcessor:
     """
@@ -26,25 +55,7 @@ class LogLineProcessor:
         should be stripped from Operation Logs. Substitution is case
         insensitive.
         """
-        # Force all keys to lower - they are compared against key.lower()
-        return set(
-            x.lower()
-            for x in [
-                "nhsNumber",
-                "successorNhsNumber",
-                "motherNhsNumber",
-                "babyNhsNumber",
-                # The following lines are output in Demographics Trace Logging
-                "queryLine",
-                "givenName",
-                "familyName",
-                # The following lines are output in CPIS Logging.
-                "authIdentityNo",
-                "laCode",
-                "laName",
-                "cpoType",
-            ]
-        )
+        return set(PID_REFERENCES)
 
     def setprocessor_keys(self):
         """
@@ -102,6 +113,49 @@ class LogLineProcessor:
         return len(set(params.keys()) & self.pid_references) > 0
 
 
+@lru_cache(maxsize=4096)
+def _classify_key(key):
+    """Classify a log key, caching the outcome as the same keys recur on every line"""
+    lower = key.lower()
+    if lower in PID_REFERENCES:
+        return _PID_KEY
+    if lower in URL_KEYS:
+        return _URL_KEY
+    return _NOT_SENSITIVE
+
+
+@lru_cache(maxsize=1024)
+def url_requires_audit(url):
+    """
+    Check whether PID has been passed as a URL parameter. The decision is
+    cached as the same URLs are commonly logged several times per request.
+    """
+    query = urlsplit(url.lower())[3]
+    return not PID_REFERENCES.isdisjoint(parse_qs(query))
+
+
+# pylint: disable=broad-except
+# As with LogLineProcessor.process, failures in the URL handling must never
+# cause critical application errors.
+def requires_audit(key, value):
+    """
+    Determine whether a log key and its value require an audit entry.
+    Equivalent to LogLineProcessor().process without building a processor.
+    """
+    if not key:
+        return False
+
+    classification = _classify_key(key)
+    if classification == _PID_KEY:
+        return True
+    if classification == _URL_KEY:
+        try:
+            return url_requires_audit(value)
+        except Exception:
+            return False
+    return False
+
+
 def check_for_param_dictionary(param_dict):
     """
     If key is 'parameters' and value is a dict, check the keys within the dict
@@ -109,8 +163,7 @@ def check_for_param_dictionary(param_dict):
     """
     if isinstance(param_dict, dict):
         for param_key in param_dict:
-            audit = LogLineProcessor().process(param_key, param_dict[param_key])
-            if audit:
+            if requires_audit(param_key, param_dict[param_key]):
                 return True
 
     return False
@@ -28,44 +28,96 @@ URL_PID_REPL = r"\1\2=___MASKED___"
 URL_PID_RE_COMPILED = re.compile(URL_PID_PATTERN)
 
 
+_TICKET = "/ticket"
+_TICKET_MASK = "/ticket ___TICKET_MASKED___ "
+_GP_PROVIDER = "'GPPROVIDER_"
+_GP_PROVIDER_MASK = "'GPPROVIDER___MASKED___'"
+_NHS_NUMBER = "nhs-number%7C"
+_NHS_NUMBER_MASK = "nhs-number%7C___MASKED___"
+
+_FHIR_RE = re.compile(r"fhir.nhs.uk", re.DOTALL)
+_DIGITS_RE = re.compile(r"\d+")
+_WHITESPACE_RE = re.compile(r"\s")
+
+# The masking functions below give identical output to matching the patterns
+# above, but locate the match with substring searches so that the cost is
+# linear in the length of the message rather than backtracking over it.
+
+
 def mask_ticket(val):
     """
     Mask the ticket (eg. "/demographicspineapplication/ticket?id=123... "
     would become:
     "/demographicspineapplication/ticket ___TICKET_MASKED___ "
+    As with TICKET_PATTERN, only the last ticket on the first line is masked
+    and only the remainder of the line it ends on is kept.
     """
-    match = TICKET_PATTERN.match(val)
-    if match:
-        masked_val = match.group(1) + "/ticket ___TICKET_MASKED___ "
-        if match.lastindex > 2:
-            return masked_val + match.group(3)
-        return masked_val
-    return val
+    first_line_end = val.find("\n")
+    if first_line_end == -1:
+        first_line_end = len(val)
+
+    position = val.rfind(_TICKET, 0, first_line_end)
+    # The ticket must be followed by at least one character which isn't a space
+    while position != -1 and (position + len(_TICKET) == len(val) or val[position + len(_TICKET)] == " "):
+        position = val.rfind(_TICKET, 0, position)
+    if position == -1:
+        return val
+
+    ticket_end = val.find(" ", position + len(_TICKET))
+    if ticket_end == -1:
+        return val[:position] + _TICKET_MASK
+    line_end = val.find("\n", ticket_end)
+    if line_end == -1:
+        line_end = len(val)
+    return val[:position] + _TICKET_MASK + val[ticket_end:line_end]
 
 
 def mask_gp_provider(val):
     """
     Mask the GPProvider part as it contains PID.
+    As with GP_PROVIDER_PATTERN, the last 'GPPROVIDER_...' quoted within a run
+    of non-whitespace characters is masked.
     """
-    match = GP_PROVIDER_PATTERN.match(val)
-    if match:
-        masked_val = match.group(1) + "'GPPROVIDER___MASKED___'"
-        if match.lastindex > 1:
-            return masked_val + match.group(2)
-        return masked_val
+    position = val.rfind(_GP_PROVIDER)
+    searched_from = None
+    quote_search_end = None
+    while position != -1:
+        value_start = position + len(_GP_PROVIDER)
+        # Only search the text not already searched for an earlier candidate,
+        # which keeps repeated candidates in one run linear
+        whitespace = _WHITESPACE_RE.search(val, value_start, len(val) if searched_from is None else searched_from)
+        if whitespace:
+            quote_search_end = whitespace.start()
+        elif searched_from is None:
+            quote_search_end = len(val)
+        else:
+            quote_search_end = searched_from + 1
+
+        quote = val.rfind("'", value_start + 1, quote_search_end)
+        if quote != -1:
+            return val[:position] + _GP_PROVIDER_MASK + val[quote + 1 :]
+
+        searched_from = value_start
+        position = val.rfind(_GP_PROVIDER, 0, position)
     return val
 
 
 def mask_nhs_number(val):
     """
-    Mask the GPProvider part as it contains PID.
+    Mask the nhs-number identifier of a fhir message as it contains PID.
+    As with NHS_NUMBER_PATTERN, the last nhs-number followed by digits after
+    a mention of fhir.nhs.uk is masked.
     """
-    match = NHS_NUMBER_PATTERN.match(val)
-    if match:
-        masked_val = match.group(1) + "nhs-number%7C___MASKED___"
-        if match.lastindex > 1:
-            return masked_val + match.group(2)
-        return masked_val
+    fhir = _FHIR_RE.search(val)
+    if not fhir:
+        return val
+
+    position = val.rfind(_NHS_NUMBER)
+    while position >= fhir.end():
+        digits = _DIGITS_RE.match(val, position + len(_NHS_NUMBER))
+        if digits:
+            return val[:position] + _NHS_NUMBER_MASK + val[digits.end() :]
+        position = val.rfind(_NHS_NUMBER, 0, position)
     return val
 
 
@@ -80,26 +132,76 @@ def mask_sensitive_url_data(val):
 
 def mask_pid(val):
     """
-    Mask any PID info
+    Mask any PID info.
+    Each masking step is only run when the message contains the text it
+    masks, so most messages are only scanned by the substring checks.
+    Values which are not strings are returned unchanged.
     """
-    masked = mask_ticket(val)
-    masked = mask_gp_provider(masked)
-    masked = mask_nhs_number(masked)
-    masked = mask_sensitive_url_data(masked)
+    if not isinstance(val, str):
+        return val
+
+    masked = val
+    if _TICKET in masked:
+        masked = mask_ticket(masked)
+    if _GP_PROVIDER in masked:
+        masked = mask_gp_provider(masked)
+    if _NHS_NUMBER in masked:
+        masked = mask_nhs_number(masked)
+    if "=" in masked:
+        masked = mask_sensitive_url_data(masked)
     return masked
 
 
-def mask_url(log_row_dict):
+def normalise_masked_keys(masked_keys=None):
     """
-    Mask out everything after a "ticket" or nhsNumber substring in the URL
+    Build the mapping of log keys to the function masking their values.
+    Keys may be given as a dictionary of key to masking function, or as an
+    iterable of keys to be masked with mask_pid. They extend the default
+    url and requestUrl keys.
     """
+    normalised = {"url": mask_pid, "requestUrl": mask_pid}
+    if masked_keys:
+        if isinstance(masked_keys, dict):
+            normalised.update(masked_keys)
+        else:
+            normalised.update((key, mask_pid) for key in masked_keys)
+    return normalised
 
-    def mask(key, val):
-        """
-        Mask only the relevant key values
-        """
-        if key in ["url", "requestUrl"]:
-            return mask_pid(val)
-        return val
 
-    return {key: mask(key, value) for (key, value) in log_row_dict.items()}
+DEFAULT_MASKED_KEYS = normalise_masked_keys()
+
+
+def create_masking_plan(field_names, masked_keys=None):
+    """
+    Work out which fields of a log template need masking, as a tuple of
+    (key, masking function) pairs - empty when there is nothing to mask
+    """
+    if masked_keys is None:
+        masked_keys = DEFAULT_MASKED_KEYS
+    return tuple((key, masked_keys[key]) for key in field_names if key in masked_keys)
+
+
+def apply_masking_plan(masking_plan, log_row_dict):
+    """
+    Mask the values named in the masking plan. The log_row_dict itself is
+    returned when there is nothing to mask, otherwise a masked copy.
+    """
+    if not masking_plan:
+        return log_row_dict
+    masked = dict(log_row_dict)
+    for key, mask_function in masking_plan:
+        if key in masked:
+            masked[key] = mask_function(masked[key])
+    return masked
+
+
+def mask_url(log_row_dict, masked_keys=None):
+    """
+    Mask out everything after a "ticket" or nhsNumber substring in the URL,
+    checking every key in the dictionary
+    """
+    if masked_keys is None:
+        masked_keys = DEFAULT_MASKED_KEYS
+    return {
+        key: masked_keys[key](value) if key in masked_keys else value for (key, value) in log_row_dict.items()
+    }
@@ -0,0 +1,52 @@
+"""
+Counters for the cost of logging itself, reported at the end of an invocation
+"""
+from spine_aws_common.log.constants import LoggingConstants
+
+
+class LogMetrics:
+    """
+    Count the lines written to each channel, the lines not written as they are
+    below the severity threshold and the bytes written, and time the rendering,
+    masking and writing of log lines.
+    Rendering and writing happen on the background writer thread when there is
+    one, so that must be drained before reporting.
+    """
+
+    def __init__(self):
+        self.lines = dict.fromkeys(LoggingConstants.LOGGING_DIRECTORIES, 0)
+        self.below_threshold = 0
+        self.bytes_written = 0
+        self.render_time = 0.0
+        self.mask_time = 0.0
+        self.write_time = 0.0
+
+    def record_write(self, log_type, log_lines, render_time, write_time):
+        """Count the lines rendered and written for one log channel"""
+        self.lines[log_type] = self.lines.get(log_type, 0) + len(log_lines)
+        # UTF-8 bytes with the newline, encoding only text which isn't ASCII
+        self.bytes_written += sum(
+            (len(log_line) if log_line.isascii() else len(log_line.encode("utf-8"))) + 1 for log_line in log_lines
+        )
+        self.render_time += render_time
+        self.write_time += write_time
+
+    def report(self):
+        """
+        The metrics as log fields, starting the counts afresh for the next
+        invocation
+        """
+        fields = {f"log_lines_{log_type}": count for log_type, count in self.lines.items()}
+        fields["log_lines_below_threshold"] = self.below_threshold
+        fields["log_bytes_written"] = self.bytes_written
+        fields["log_render_ms"] = round(self.render_time * 1000, 3)
+        fields["log_mask_ms"] = round(self.mask_time * 1000, 3)
+        fields["log_write_ms"] = round(self.write_time * 1000, 3)
+
+        self.lines = dict.fromkeys(self.lines, 0)
+        self.below_threshold = 0
+        self.bytes_written = 0
+        self.render_time = 0.0
+        self.mask_time = 0.0
+        self.write_time = 0.0
+        return fields
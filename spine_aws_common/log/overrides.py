@@ -0,0 +1,70 @@
+"""
+Severity thresholds for individual log references and processes, changed at
+runtime from a parameter source without a redeploy or cold start
+"""
+import sys
+import time
+
+from spine_aws_common.log.details import is_known_level, level_value
+
+REFERENCES = "logReferences"
+PROCESSES = "processes"
+
+
+class SeverityOverrides:
+    """
+    Severity thresholds loaded from a parameter source, e.g. an SSM parameter
+    holding {"logReferences": {"MESH0001": "DEBUG"}, "processes": {"mesh_send": "DEBUG"}}.
+    A log reference's threshold takes precedence over its process's, which
+    takes precedence over the logger's own. The source is only loaded again
+    once ttl seconds have passed, and the previous thresholds are kept if it
+    fails. An empty table is falsy so the logger can skip it altogether.
+    """
+
+    DEFAULT_TTL = 60
+
+    def __init__(self, load_overrides, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.load_overrides = load_overrides
+        self.ttl = ttl
+        self._clock = clock
+        self._reference_thresholds = {}
+        self._process_thresholds = {}
+        self._refresh_at = None
+
+    def __bool__(self):
+        return bool(self._reference_thresholds or self._process_thresholds)
+
+    def refresh(self):
+        """Load the thresholds from the source if the TTL has passed"""
+        now = self._clock()
+        if self._refresh_at is not None and now < self._refresh_at:
+            return
+        self._refresh_at = now + self.ttl
+        try:
+            overrides = self.load_overrides() or {}
+            reference_thresholds = self._threshold_values(overrides.get(REFERENCES))
+            process_thresholds = self._threshold_values(overrides.get(PROCESSES))
+        except Exception as err:  # pylint:disable=broad-except
+            # Logging must carry on at the thresholds it already has
+            print(f"Severity overrides refresh failure: {err!r}", file=sys.stderr)
+            return
+        self._reference_thresholds = reference_thresholds
+        self._process_thresholds = process_thresholds
+
+    @staticmethod
+    def _threshold_values(thresholds):
+        """The numeric thresholds, ignoring levels the log base does not know"""
+        threshold_values = {}
+        for name, log_level in (thresholds or {}).items():
+            if is_known_level(log_level):
+                threshold_values[name] = level_value(log_level)
+            else:
+                print(f"Unknown severity override {log_level} for {name}", file=sys.stderr)
+        return threshold_values
+
+    def threshold_value(self, log_reference, process_name, default_threshold_value):
+        """The numeric severity threshold for a log reference written by a process"""
+        threshold_value = self._reference_thresholds.get(log_reference)
+        if threshold_value is not None:
+            return threshold_value
+        return self._process_thresholds.get(process_name, default_threshold_value)
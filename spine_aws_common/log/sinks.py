@@ -0,0 +1,363 @@
+"""
+Destinations for rendered log lines.
+
+A log sink has write(log_line, log_type), where log_type is the channel the
+line belongs to (operations, audit, monitor or crashdump), and flush(). Sinks
+which format exception tracebacks themselves set formats_exceptions, and are
+passed exc_info when writing a crashdump. Sinks which can write many lines
+at once have write_lines(lines), taking (log_line, log_type) pairs.
+ChannelSink sends each channel to its own destination.
+"""
+import logging
+import os
+import sys
+import time
+
+from spine_aws_common.log.constants import LoggingConstants
+
+
+class StdoutSink:
+    """
+    Print each log line to standard out for Cloudwatch logging
+    """
+
+    formats_exceptions = False
+
+    def write(self, log_line, log_type):
+        """Write a single rendered log line"""
+        # pylint:disable=unused-argument
+        print(log_line)
+
+    def write_lines(self, lines):
+        """Write many rendered log lines in a single write"""
+        # Resolve stdout at write time as it may have been redirected
+        sys.stdout.write("".join(log_line + "\n" for log_line, _ in lines))
+
+    def flush(self):
+        """Nothing is held back so there is nothing to flush"""
+
+
+class BufferedStdoutSink(StdoutSink):
+    """
+    Collect log lines in memory and write them to standard out in large chunks,
+    once buffer_size characters are held or when flushed. The owner must flush
+    at the end of each invocation so that no lines are lost.
+    """
+
+    DEFAULT_BUFFER_SIZE = 256 * 1024
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._lines = []
+        self._buffered = 0
+
+    def write(self, log_line, log_type):
+        """Buffer a single rendered log line"""
+        self._lines.append(log_line)
+        self._buffered += len(log_line) + 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_lines(self, lines):
+        """Buffer many rendered log lines"""
+        for log_line, _ in lines:
+            self._lines.append(log_line)
+            self._buffered += len(log_line) + 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered in a single write"""
+        if not self._lines:
+            return
+        output = "\n".join(self._lines) + "\n"
+        self._lines = []
+        self._buffered = 0
+        # Resolve stdout at write time as it may have been redirected
+        sys.stdout.write(output)
+        sys.stdout.flush()
+
+
+class PythonLoggingSink:
+    """
+    Pass each log line to the Spine Python logger, at the level for its channel
+    so that the logger's handlers and filters route it, e.g. to log files. The
+    logger's methods are looked up once rather than for every line.
+    """
+
+    formats_exceptions = True
+
+    def __init__(self, logger=None):
+        logger = logger or logging.getLogger(LoggingConstants.SPINE_LOGGER)
+        self._logging_functions = {
+            LoggingConstants.LFR_AUDIT: logger.audit,
+            LoggingConstants.LFR_NMS: logger.monitor,
+            LoggingConstants.LFR_OPERATIONS: logger.info,
+            LoggingConstants.LFR_CRASHDUMP: logger.crash,
+        }
+
+    def write(self, log_line, log_type, exc_info=None):
+        """Log a single rendered log line"""
+        logging_function = self._logging_functions.get(log_type)
+        if logging_function is None:
+            return
+        if exc_info:
+            # Pass the exception explicitly as this may be running on the
+            # background writer thread rather than where it was caught
+            logging_function(log_line, exc_info=exc_info)
+        else:
+            logging_function(log_line)
+
+    def flush(self):
+        """Python logging handlers manage their own flushing"""
+
+
+class FileSink:
+    """
+    Append log lines to a file per channel in the log directory, e.g.
+    operations.log and audit.log
+    """
+
+    formats_exceptions = False
+
+    def __init__(self, log_directory, buffering=-1):
+        self.log_directory = log_directory
+        self.buffering = buffering
+        self._files = {}
+
+    def _open(self, log_type):
+        """Open the file for the channel on first use"""
+        path = os.path.join(self.log_directory, log_type + LoggingConstants.LOG_SUFFIX)
+        log_file = self._files[log_type] = open(  # pylint:disable=consider-using-with
+            path, "a", encoding="utf-8", buffering=self.buffering
+        )
+        return log_file
+
+    def write(self, log_line, log_type):
+        """Append a single rendered log line"""
+        log_file = self._files.get(log_type) or self._open(log_type)
+        log_file.write(log_line + "\n")
+
+    def flush(self):
+        """Flush every open file"""
+        for log_file in self._files.values():
+            log_file.flush()
+
+    def close(self):
+        """Close every open file"""
+        for log_file in self._files.values():
+            log_file.close()
+        self._files = {}
+
+
+class MemorySink:
+    """
+    Hold log lines in memory as (log_type, log_line), e.g. for tests
+    """
+
+    formats_exceptions = False
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, log_line, log_type):
+        """Hold a single rendered log line"""
+        self.lines.append((log_type, log_line))
+
+    def write_lines(self, lines):
+        """Hold many rendered log lines"""
+        self.lines.extend((log_type, log_line) for log_line, log_type in lines)
+
+    def flush(self):
+        """Nothing is written out so there is nothing to flush"""
+
+    def lines_for(self, log_type):
+        """The log lines written to a channel"""
+        return [log_line for line_type, log_line in self.lines if line_type == log_type]
+
+
+class HourlyFileSink:
+    """
+    Write each channel to its own file, rotated hourly, for long running
+    workers, e.g. log_directory/operations/2023010112.log.
+    Lines are collected per channel and written in large chunks once
+    buffer_size characters are held, on rotation or when flushed, so the owner
+    must flush periodically and before exit. There is no locking, so a sink
+    must only be written from one thread, e.g. the background writer.
+    """
+
+    # pylint:disable=too-many-instance-attributes
+
+    formats_exceptions = False
+
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, log_directory, buffer_size=DEFAULT_BUFFER_SIZE, clock=time.time):
+        self.log_directory = log_directory
+        self.buffer_size = buffer_size
+        self._clock = clock
+        self._files = {}
+        self._buffers = {}
+        self._buffered = {}
+        self._file_hour = None
+        self._rotate_at = 0
+
+    def write(self, log_line, log_type):
+        """Buffer a single rendered log line"""
+        if self._clock() >= self._rotate_at:
+            self._rotate()
+
+        buffer = self._buffers.get(log_type)
+        if buffer is None:
+            buffer = self._buffers[log_type] = []
+            self._buffered[log_type] = 0
+        buffer.append(log_line)
+        buffered = self._buffered[log_type] = self._buffered[log_type] + len(log_line) + 1
+        if buffered >= self.buffer_size:
+            self._write_buffer(log_type)
+
+    def _rotate(self):
+        """Write out and close the last hour's files, starting the next hour"""
+        self.close()
+        local_time = time.localtime(self._clock())
+        self._file_hour = time.strftime(LoggingConstants.FILE_DATE_FORMAT, local_time)
+        hour_start = time.mktime(local_time[:4] + (0, 0) + local_time[6:])
+        self._rotate_at = hour_start + 3600
+
+    def _write_buffer(self, log_type):
+        """Write the lines buffered for the channel to its file in one write"""
+        buffer = self._buffers.get(log_type)
+        if not buffer:
+            return
+        log_file = self._files.get(log_type)
+        if log_file is None:
+            channel_directory = os.path.join(self.log_directory, log_type)
+            os.makedirs(channel_directory, exist_ok=True)
+            path = os.path.join(channel_directory, self._file_hour + LoggingConstants.LOG_SUFFIX)
+            log_file = self._files[log_type] = open(path, "ab", buffering=0)  # pylint:disable=consider-using-with
+        log_file.write(("\n".join(buffer) + "\n").encode("utf-8"))
+        self._buffers[log_type] = []
+        self._buffered[log_type] = 0
+
+    def flush(self):
+        """Write out every channel's buffered lines"""
+        for log_type in self._buffers:
+            self._write_buffer(log_type)
+
+    def close(self):
+        """Write out every channel's buffered lines and close the files"""
+        self.flush()
+        for log_file in self._files.values():
+            log_file.close()
+        self._files = {}
+
+
+class StreamSink:
+    """
+    Write log lines to a file object, e.g. one opened on a file descriptor a
+    log shipper reads from. Lines are buffered by the file object until
+    flushed. The stream is only closed by close() if close_stream is set.
+    """
+
+    formats_exceptions = False
+
+    def __init__(self, stream, close_stream=False):
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def write(self, log_line, log_type):
+        """Write a single rendered log line"""
+        # pylint:disable=unused-argument
+        self.stream.write(log_line + "\n")
+
+    def flush(self):
+        """Flush the stream"""
+        self.stream.flush()
+
+    def close(self):
+        """Flush the stream, closing it if owned"""
+        self.stream.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+class InProcessQueueSink:
+    """
+    Put each log line on an in-process queue, e.g. a queue.Queue read by a
+    thread shipping the channel elsewhere
+    """
+
+    formats_exceptions = False
+
+    def __init__(self, event_queue):
+        self.event_queue = event_queue
+
+    def write(self, log_line, log_type):
+        """Queue a single rendered log line"""
+        # pylint:disable=unused-argument
+        self.event_queue.put(log_line)
+
+    def flush(self):
+        """Lines are queued as they are written so there is nothing to flush"""
+
+
+def create_destination_sink(destination):
+    """
+    The log sink for a channel destination, which may be a log sink, a file
+    descriptor, a file path, an open file object or an in-process queue
+    """
+    if hasattr(destination, "formats_exceptions"):
+        return destination
+    if isinstance(destination, int):
+        return StreamSink(os.fdopen(destination, "w", encoding="utf-8", closefd=False), close_stream=True)
+    if isinstance(destination, (str, os.PathLike)):
+        log_file = open(destination, "a", encoding="utf-8")  # pylint:disable=consider-using-with
+        return StreamSink(log_file, close_stream=True)
+    if hasattr(destination, "write"):
+        return StreamSink(destination)
+    if hasattr(destination, "put"):
+        return InProcessQueueSink(destination)
+    raise ValueError(f"Unknown log destination {destination!r}")
+
+
+class ChannelSink:
+    """
+    Route each channel to its own destination, keyed by LoggingConstants.LFR_*,
+    so that each can be shipped and indexed separately rather than by
+    filtering a single stream, e.g.
+        ChannelSink({LoggingConstants.LFR_AUDIT: 3, LoggingConstants.LFR_CRASHDUMP: "/var/log/crashdump.log"})
+    Channels without a destination are written to default_sink, by default
+    standard out.
+    """
+
+    def __init__(self, destinations, default_sink=None):
+        self.default_sink = default_sink or StdoutSink()
+        self._sinks = {log_type: create_destination_sink(destination) for log_type, destination in destinations.items()}
+        for log_type in LoggingConstants.LOGGING_DIRECTORIES:
+            self._sinks.setdefault(log_type, self.default_sink)
+        # Only pass tracebacks on if the crashdump destination formats them
+        self.formats_exceptions = self._sinks[LoggingConstants.LFR_CRASHDUMP].formats_exceptions
+
+    def write(self, log_line, log_type, exc_info=None):
+        """Write a single rendered log line to its channel's destination"""
+        log_sink = self._sinks.get(log_type, self.default_sink)
+        if exc_info is None:
+            log_sink.write(log_line, log_type)
+        else:
+            log_sink.write(log_line, log_type, exc_info=exc_info)
+
+    def flush(self):
+        """Flush every destination"""
+        for log_sink in self._distinct_sinks():
+            log_sink.flush()
+
+    def close(self):
+        """Close every destination which can be closed"""
+        for log_sink in self._distinct_sinks():
+            close = getattr(log_sink, "close", None)
+            if close is not None:
+                close()
+
+    def _distinct_sinks(self):
+        """Each destination once, however many channels share it"""
+        return list({id(log_sink): log_sink for log_sink in self._sinks.values()}.values())
@@ -24,6 +24,8 @@ TRACE = 9
 
 _LOG_BASE_CACHE = {}
 
+_LEVEL_AND_TEXT_OPTIONS = (LoggingConstants.SECTION_LEVEL.lower(), LoggingConstants.SECTION_TEXT.lower())
+
 
 def get_log_base_config(log_base):
     """
@@ -40,23 +42,37 @@ def get_log_base_config(log_base):
     # log base config files have been provided
     log_base_dict = _LOG_BASE_CACHE.get(str(log_base))
     if not log_base_dict:
-        log_base_config = configparser.RawConfigParser()
-        log_base_config.read(log_base)
-        log_base_dict = {}
-        for log_ref in log_base_config.sections():
-            try:
-                level = log_base_config.get(log_ref, LoggingConstants.SECTION_LEVEL)
-            except configparser.NoOptionError:
-                level = "INFO"
+        log_base_dict = _LOG_BASE_CACHE[str(log_base)] = parse_log_base_config(log_base)
+
+    return log_base_dict
 
-            try:
-                text = log_base_config.get(log_ref, LoggingConstants.SECTION_TEXT)
-            except configparser.NoOptionError:
-                text = log_base_config.get("UTI9999", "Log Text")
 
-            log_base_dict[log_ref] = [level, text]
+def parse_log_base_config(log_base):
+    """
+    Parse the log base config files into a dictionary of [level, text] keyed by
+    log reference. Any options other than the level and text (e.g. Sample Rate)
+    are held in a third element, keyed by lower case option name.
+    """
+    log_base_config = configparser.RawConfigParser()
+    log_base_config.read(log_base)
+    log_base_dict = {}
+    for log_ref in log_base_config.sections():
+        try:
+            level = log_base_config.get(log_ref, LoggingConstants.SECTION_LEVEL)
+        except configparser.NoOptionError:
+            level = "INFO"
+
+        try:
+            text = log_base_config.get(log_ref, LoggingConstants.SECTION_TEXT)
+        except configparser.NoOptionError:
+            text = log_base_config.get("UTI9999", "Log Text")
 
-        _LOG_BASE_CACHE[str(log_base)] = log_base_dict
+        options = {
+            option: value
+            for option, value in log_base_config.items(log_ref)
+            if option not in _LEVEL_AND_TEXT_OPTIONS
+        }
+        log_base_dict[log_ref] = [level, text, options] if options else [level, text]
 
     return log_base_dict
 
@@ -153,7 +169,8 @@ class SpineLogger(logging.Logger):
         Log 'msg % args' with severity 'CRASH'.
         """
         if self.isEnabledFor(CRASH):
-            self._log(CRASH, msg, args, exc_info=True, **kwargs)
+            kwargs.setdefault("exc_info", True)
+            self._log(CRASH, msg, args, **kwargs)
 
     @classmethod
     def get_process_name(cls):
@@ -0,0 +1,85 @@
+"""
+Sampling, rate limiting and byte budgets to bound the volume of logs written
+when the same problem is logged over and over
+"""
+import random
+import time
+
+
+class LogSuppressor:
+    """
+    Decide whether a log line should be suppressed, counting what has been
+    suppressed so it can be summarised at the end of the invocation.
+    - References with a Sample Rate in the log base are written at that rate
+    - References with a Rate Limit are limited to that many lines per second
+      by a token bucket holding up to Rate Burst lines
+    - Once byte_budget bytes have been written in an invocation, all further
+      lines are suppressed
+    Audit and crashdump lines are never suppressed, but do count towards the
+    byte budget.
+    """
+
+    def __init__(self, byte_budget=None, random_function=random.random, clock=time.monotonic):
+        self.byte_budget = byte_budget
+        self.bytes_written = 0
+        self.suppressed = {}
+        self._random = random_function
+        self._clock = clock
+        self._buckets = {}
+
+    def allow(self, log_reference, log_details, protected):
+        """
+        Check whether the log line may be written, counting it if not.
+        Protected lines (audit and crashdump) are always allowed.
+        """
+        if protected:
+            return True
+
+        if self.byte_budget is not None and self.bytes_written >= self.byte_budget:
+            return self._suppress(log_reference)
+        if log_details.sample_rate is not None and self._random() >= log_details.sample_rate:
+            return self._suppress(log_reference)
+        if log_details.rate_limit is not None and not self._take_token(log_reference, log_details):
+            return self._suppress(log_reference)
+        return True
+
+    def _take_token(self, log_reference, log_details):
+        """Take a token from the reference's bucket, refilled at the rate limit"""
+        now = self._clock()
+        bucket = self._buckets.get(log_reference)
+        if bucket is None:
+            bucket = self._buckets[log_reference] = [log_details.rate_burst, now]
+        else:
+            bucket[0] = min(log_details.rate_burst, bucket[0] + (now - bucket[1]) * log_details.rate_limit)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _suppress(self, log_reference):
+        """Count a suppressed line"""
+        self.suppressed[log_reference] = self.suppressed.get(log_reference, 0) + 1
+        return False
+
+    def record_bytes(self, log_line):
+        """Count the UTF-8 bytes of a written line, and its newline, towards the byte budget"""
+        # ASCII text, the usual case, is one byte per character so needn't be encoded
+        self.bytes_written += (len(log_line) if log_line.isascii() else len(log_line.encode("utf-8"))) + 1
+
+    def reset(self):
+        """
+        Start a new invocation, returning the summary of what was suppressed
+        during the last one. Rate limit buckets carry over as they are time based.
+        """
+        summary = {
+            "suppressed_lines": sum(self.suppressed.values()),
+            "suppressed_references": ",".join(
+                f"{log_reference}:{count}" for log_reference, count in sorted(self.suppressed.items())
+            ),
+            "bytes_written": self.bytes_written,
+        }
+        self.suppressed = {}
+        self.bytes_written = 0
+        return summary
@@ -5,6 +5,7 @@ import logging
 
 from spine_aws_common.log.logutil import write_log
 from spine_aws_common.log.masking import mask_pid
+from spine_aws_common.log.truncation import cap_text
 
 SEVERITY_INPUT_MAP = {
     "CRITICAL": logging.CRITICAL,
@@ -18,6 +19,64 @@ SEVERITY_INPUT_MAP = {
 }
 
 
+# Level set on a library's logger once it has written its lines for the invocation
+_SILENCED = logging.CRITICAL + 1
+
+
+class LibraryLogLevels:
+    """
+    Minimum levels and maximum lines per invocation for the Python loggers of
+    third party libraries, keyed by logger name prefix, e.g.
+        {"botocore": ("WARN", 100), "urllib3": "ERROR"}
+    A prefix covers the loggers beneath it, so "botocore" includes
+    "botocore.endpoint". Both are applied through the levels of the loggers,
+    so records which would be dropped are never created.
+    """
+
+    def __init__(self, library_levels):
+        self.levels = {}
+        self.max_lines = {}
+        for prefix, setting in library_levels.items():
+            level, max_lines = (setting, None) if isinstance(setting, str) else setting
+            if level is not None:
+                self.levels[prefix] = SEVERITY_INPUT_MAP[level]
+            if max_lines is not None:
+                self.max_lines[prefix] = max_lines
+        self.lines = {}
+        self._limited_prefixes = {}
+
+    def apply(self):
+        """Set the level of each library's logger"""
+        for prefix in set(self.levels) | set(self.max_lines):
+            logging.getLogger(prefix).setLevel(self.levels.get(prefix, logging.NOTSET))
+
+    def _limited_prefix(self, name):
+        """The longest prefix with a line limit covering the logger, if any"""
+        try:
+            return self._limited_prefixes[name]
+        except KeyError:
+            pass
+        matches = [prefix for prefix in self.max_lines if name == prefix or name.startswith(prefix + ".")]
+        prefix = self._limited_prefixes[name] = max(matches, key=len) if matches else None
+        return prefix
+
+    def record_line(self, name):
+        """Count a line written for the logger, silencing its library once it reaches its limit"""
+        prefix = self._limited_prefix(name)
+        if prefix is None:
+            return
+        lines = self.lines[prefix] = self.lines.get(prefix, 0) + 1
+        if lines == self.max_lines[prefix]:
+            logging.getLogger(prefix).setLevel(_SILENCED)
+
+    def reset(self):
+        """Start a new invocation, restoring the level of any library silenced in the last"""
+        for prefix, lines in self.lines.items():
+            if lines >= self.max_lines[prefix]:
+                logging.getLogger(prefix).setLevel(self.levels.get(prefix, logging.NOTSET))
+        self.lines = {}
+
+
 class LoggingAdapter(logging.Handler):
     """
     Adapter to allow libraries that use python logging to output to our logger
@@ -94,17 +153,57 @@ class LoggingAdapter(logging.Handler):
         )
     }
 
-    def __init__(self, log_object=None):
+    def __init__(self, log_object=None, library_levels=None):
         logging.Handler.__init__(self, logging.DEBUG)
         self.log_object = log_object
+        self.library_levels = library_levels
+
+        # Precomputed so that each record only needs dictionary lookups, with
+        # the maps indexed by logger name so other loggers skip them entirely
+        self._level_references = {
+            logging.CRITICAL: self.CRITICAL,
+            logging.FATAL: self.CRITICAL,
+            logging.ERROR: self.ERROR,
+            logging.WARNING: self.WARN,
+            logging.WARN: self.WARN,
+            logging.INFO: self.INFO,
+            # Allow us to enable python debug independently
+            logging.DEBUG: self.TRACE,
+        }
+        self._summary_map = _index_by_name(self._LOGGER_SUMMARY_MAP)
+        self._detail_map = _index_by_name(self._LOGGER_DETAIL_MAP)
+
+    def reset_library_levels(self):
+        """Start a new invocation's library line limits"""
+        if self.library_levels is not None:
+            self.library_levels.reset()
 
     def emit(self, record):
         """Override emit to output to our log file"""
-        name, level, levelname, message = self._switch_log(
-            record.name, record.levelno, record.levelname, record.getMessage()
+        name, level, levelname = self._switch_summary(record.name, record.levelno, record.levelname)
+
+        # Drop records below our severity threshold before formatting and
+        # masking the message, unless the message may change the level
+        if (
+            self.log_object
+            and name not in self._detail_map
+            and not self.log_object.is_enabled(self._get_log_reference(level))
+        ):
+            return
+
+        name, level, levelname, message = self._switch_detail(
+            name, level, levelname, self._switch_message(record.getMessage())
         )
 
+        if self.library_levels is not None:
+            self.library_levels.record_line(record.name)
+
         masked_message = mask_pid(message)
+        # Cap request bodies and the like once masked, as a cut through an
+        # identifier would stop it being recognised
+        max_field_bytes = getattr(self.log_object, "max_field_bytes", None)
+        if max_field_bytes is not None:
+            masked_message = cap_text(masked_message, max_field_bytes)
         log_reference = self._get_log_reference(level)
         log_dict = {"logger": name, "message": masked_message, "level": levelname}
 
@@ -120,44 +219,50 @@ class LoggingAdapter(logging.Handler):
                 return
             write_log(log_reference, None, log_dict)
 
-    def _switch_log(self, name, level, levelname, message):
-        """
-        If the log is in the dictionary, return the dictionary output instead
-        """
-        name, level, levelname = LoggingAdapter._LOGGER_SUMMARY_MAP.get(
-            (name, level, levelname), (name, level, levelname)
-        )
+    def _switch_summary(self, name, level, levelname):
+        """Apply the mapping for all logs of the logger"""
+        summary_map = self._summary_map.get(name)
+        if summary_map is None:
+            return name, level, levelname
+        return summary_map.get((level, levelname), (name, level, levelname))
 
+    def _switch_message(self, message):
+        """Replace the message where a known substring is found"""
         for finder, value in self._MESSAGE_MAP.items():
             if finder in message:
                 message = value
+        return message
 
-        return LoggingAdapter._LOGGER_DETAIL_MAP.get(
-            (name, level, levelname, message), (name, level, levelname, message)
-        )
+    def _switch_detail(self, name, level, levelname, message):
+        """Apply the mapping for logs of the logger with a specific message"""
+        detail_map = self._detail_map.get(name)
+        if detail_map is None:
+            return name, level, levelname, message
+        return detail_map.get((level, levelname, message), (name, level, levelname, message))
 
     def _get_log_reference(self, level):
         """
         Get the log reference based on the output map
         """
-        output_map = {
-            logging.CRITICAL: self.CRITICAL,
-            logging.FATAL: self.CRITICAL,
-            logging.ERROR: self.ERROR,
-            logging.WARNING: self.WARN,
-            logging.WARN: self.WARN,
-            logging.INFO: self.INFO,
-            # Allow us to enable python debug independently
-            logging.DEBUG: self.TRACE,
-        }
+        return self._level_references[level]
 
-        return output_map[level]
+
+def _index_by_name(log_map):
+    """
+    Index a map keyed by (logger name, ...) by logger name, then by the rest
+    of the key
+    """
+    index = {}
+    for key, value in log_map.items():
+        index.setdefault(key[0], {})[key[1:]] = value
+    return index
 
 
-def configure_third_party_logging_adapter(severity_threshold):
+def configure_third_party_logging_adapter(severity_threshold, library_levels=None):
     """
     Configure an adapter to allow libraries that use standard Python logging to
-    output to our log files.
+    output to our log files, with library_levels optionally setting the minimum
+    level and maximum lines per invocation of individual libraries.
     """
     root_logger = logging.getLogger()
     if root_logger.handlers:
@@ -165,5 +270,15 @@ def configure_third_party_logging_adapter(severity_threshold):
             root_logger.removeHandler(handler)
     root_logger.setLevel(SEVERITY_INPUT_MAP[severity_threshold])
 
-    adapter = LoggingAdapter()
+    adapter = LoggingAdapter(library_levels=create_library_levels(library_levels))
     root_logger.addHandler(adapter)
+    return adapter
+
+
+def create_library_levels(library_levels):
+    """Apply the library levels, returning None where there are none"""
+    if not library_levels:
+        return None
+    library_levels = LibraryLogLevels(library_levels)
+    library_levels.apply()
+    return library_levels
@@ -0,0 +1,49 @@
+"""
+Capping the size of log substitutions and log lines, so oversized values such
+as whole request bodies are cut once masked, before they are rendered
+"""
+TRUNCATION_TEXT = "... truncated originalLength={}"
+
+# The most bytes a character takes in UTF-8
+_MAX_CHARACTER_BYTES = 4
+
+
+def cap_text(text, max_bytes):
+    """
+    Cap text at max_bytes when UTF-8 encoded, including the marker of the
+    original length in characters which replaces the end of truncated text
+    """
+    length = len(text)
+    if length * _MAX_CHARACTER_BYTES <= max_bytes:
+        return text
+    if text.isascii():
+        if length <= max_bytes:
+            return text
+        marker = TRUNCATION_TEXT.format(length)
+        return text[: max(max_bytes - len(marker), 0)] + marker
+
+    encoded = text.encode("utf-8", "surrogatepass")
+    if len(encoded) <= max_bytes:
+        return text
+    marker = TRUNCATION_TEXT.format(length)
+    kept = encoded[: max(max_bytes - len(marker), 0)]
+    # Drop any character cut part way through
+    return kept.decode("utf-8", "ignore") + marker
+
+
+def cap_fields(log_row_dict, max_field_bytes):
+    """
+    The substitutions with every text value capped at max_field_bytes,
+    copying the dictionary only if a value is cut. Other values are left as
+    they are. Values must already be masked, as a cut through an identifier
+    would stop it being recognised.
+    """
+    capped_dict = None
+    for key, value in log_row_dict.items():
+        if isinstance(value, str) and len(value) * _MAX_CHARACTER_BYTES > max_field_bytes:
+            capped_value = cap_text(value, max_field_bytes)
+            if capped_value is not value:
+                if capped_dict is None:
+                    capped_dict = dict(log_row_dict)
+                capped_dict[key] = capped_value
+    return log_row_dict if capped_dict is None else capped_dict
@@ -0,0 +1,189 @@
+"""
+Build time validation of log base templates against their write_log call sites
+
+Call sites are validated at build time with:
+    python -m spine_aws_common.log.validation src --log-config mylogbase.cfg
+which exits non-zero if any template doesn't match its call sites.
+"""
+from collections import namedtuple
+import argparse
+import ast
+import os
+import sys
+
+from spine_aws_common.log.details import get_log_catalog
+from spine_aws_common.log.formatting import DEFAULT_KEYS
+
+DEFAULT_LOG_BASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cloudlogbase.cfg")
+
+CallSite = namedtuple("CallSite", ["path", "line", "log_reference", "keys"])
+TemplateMismatch = namedtuple(
+    "TemplateMismatch", ["call_site", "missing_keys", "unused_keys", "unknown_reference"], defaults=(False,)
+)
+
+
+def _literal_dict_keys(node):
+    """
+    Keys of a dictionary literal or dict(...) call, or None if they can't be
+    determined statically
+    """
+    if isinstance(node, ast.Dict):
+        if not all(isinstance(key, ast.Constant) and isinstance(key.value, str) for key in node.keys):
+            return None
+        return frozenset(key.value for key in node.keys)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "dict" and not node.args:
+        if any(keyword.arg is None for keyword in node.keywords):
+            return None
+        return frozenset(keyword.arg for keyword in node.keywords)
+    if isinstance(node, ast.Constant) and node.value is None:
+        return frozenset()
+    return None
+
+
+def _call_argument(call, position, name):
+    """Get a call argument by position or keyword"""
+    if len(call.args) > position:
+        return call.args[position]
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+class _CallSiteVisitor(ast.NodeVisitor):
+    """
+    Collect write_log calls with a literal log reference and statically known
+    substitution keys. Dictionaries held in a local variable are resolved from
+    the most recent assignment of a literal in the same function.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.call_sites = []
+        self._assignments = [{}]
+
+    def visit_FunctionDef(self, node):  # noqa: N802 pylint:disable=invalid-name
+        """Track assignments per function"""
+        self._assignments.append({})
+        self.generic_visit(node)
+        self._assignments.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef  # noqa: N815
+
+    def visit_Assign(self, node):  # noqa: N802 pylint:disable=invalid-name
+        """Record dictionary literal assignments"""
+        self.generic_visit(node)
+        keys = _literal_dict_keys(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                self._assignments[-1][target.id] = keys
+
+    def visit_Call(self, node):  # noqa: N802 pylint:disable=invalid-name
+        """Record write_log call sites"""
+        self.generic_visit(node)
+        func_name = getattr(node.func, "attr", None) or getattr(node.func, "id", None)
+        if func_name != "write_log":
+            return
+
+        log_reference = _call_argument(node, 0, "log_reference")
+        if not isinstance(log_reference, ast.Constant) or not isinstance(log_reference.value, str):
+            return
+
+        log_row_dict = _call_argument(node, 2, "log_row_dict")
+        if log_row_dict is None:
+            keys = frozenset()
+        elif isinstance(log_row_dict, ast.Name):
+            keys = self._assignments[-1].get(log_row_dict.id)
+        else:
+            keys = _literal_dict_keys(log_row_dict)
+
+        if keys is not None:
+            self.call_sites.append(CallSite(self.path, node.lineno, log_reference.value, keys))
+
+
+def _python_files(source_paths):
+    """Expand directories into the python files they contain"""
+    for source_path in source_paths:
+        if os.path.isdir(source_path):
+            for dir_path, _, file_names in os.walk(source_path):
+                for file_name in sorted(file_names):
+                    if file_name.endswith(".py"):
+                        yield os.path.join(dir_path, file_name)
+        else:
+            yield source_path
+
+
+def find_call_sites(source_paths):
+    """
+    Find the write_log call sites in the python source files and directories
+    """
+    call_sites = []
+    for path in _python_files(source_paths):
+        with open(path, encoding="utf-8") as source_file:
+            tree = ast.parse(source_file.read(), filename=path)
+        visitor = _CallSiteVisitor(path)
+        visitor.visit(tree)
+        call_sites.extend(visitor.call_sites)
+    return call_sites
+
+
+def validate_call_sites(log_catalog, call_sites):
+    """
+    Compare the fields of each log reference template against the keys passed
+    at its call sites. Missing keys would fall into the KeyError substitution
+    failure at runtime; unused keys are never written. Log references not in
+    the log base are reported as unknown rather than checked against the
+    default template.
+    """
+    mismatches = []
+    for call_site in call_sites:
+        if call_site.log_reference not in log_catalog:
+            mismatches.append(TemplateMismatch(call_site, [], [], unknown_reference=True))
+            continue
+        log_template = log_catalog.get(call_site.log_reference).log_template
+        field_names = set(log_template.field_names)
+        missing_keys = field_names - call_site.keys - set(DEFAULT_KEYS)
+        unused_keys = call_site.keys - field_names
+        if missing_keys or unused_keys:
+            mismatches.append(TemplateMismatch(call_site, sorted(missing_keys), sorted(unused_keys)))
+    return mismatches
+
+
+def validate_log_references(log_catalog, source_paths):
+    """
+    Report log base templates whose fields don't match their write_log call
+    sites - intended to be run as part of a build
+    """
+    mismatches = validate_call_sites(log_catalog, find_call_sites(source_paths))
+    for mismatch in mismatches:
+        if mismatch.unknown_reference:
+            print(
+                f"Unknown log reference - fail build: logReference={mismatch.call_site.log_reference} "
+                f"at {mismatch.call_site.path}:{mismatch.call_site.line}"
+            )
+            continue
+        print(
+            f"Log template mismatch - fail build: logReference={mismatch.call_site.log_reference} "
+            f"at {mismatch.call_site.path}:{mismatch.call_site.line} "
+            f"missing_keys={mismatch.missing_keys} unused_keys={mismatch.unused_keys}"
+        )
+    return mismatches
+
+
+def main(argv=None):
+    """Validate the write_log call sites in the python files and directories given on the command line"""
+    parser = argparse.ArgumentParser(description="Validate log base templates against their write_log call sites")
+    parser.add_argument("source", nargs="+", help="python files or directories holding the write_log call sites")
+    parser.add_argument("--log-base", default=DEFAULT_LOG_BASE, help="log base cfg file, defaults to cloudlogbase.cfg")
+    parser.add_argument("--log-config", help="additional log config cfg file, overriding the log base")
+    args = parser.parse_args(argv)
+
+    log_catalog = get_log_catalog(args.log_base, args.log_config)
+    if validate_log_references(log_catalog, args.source):
+        return 1
+    print("Log templates match their call sites")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,57 @@
 """
 Created 18th June 2019
 """
-import logging
-
 from spine_aws_common.log.constants import LoggingConstants
 from spine_aws_common.log.formatting import create_log_line
+from spine_aws_common.log.sinks import PythonLoggingSink
+
+FILE_DATE_FORMAT = LoggingConstants.FILE_DATE_FORMAT
+
+_BACKGROUND_WRITER = None
 
-FILE_DATE_FORMAT = "%Y%m%d%H"  # pylint:disable=duplicate-code
+
+def set_background_writer(background_writer):
+    """
+    Render and write log lines on a BackgroundLogWriter rather than inline.
+    Pass None to return to writing inline.
+    """
+    global _BACKGROUND_WRITER  # pylint:disable=global-statement
+    _BACKGROUND_WRITER = background_writer
 
 
-def _get_logging_function(log_type):
-    """Get the logging function to use"""
-    if log_type == LoggingConstants.LFR_AUDIT:
-        return logging.getLogger(LoggingConstants.SPINE_LOGGER).audit
-    if log_type == LoggingConstants.LFR_NMS:
-        return logging.getLogger(LoggingConstants.SPINE_LOGGER).monitor
-    if log_type == LoggingConstants.LFR_OPERATIONS:
-        return logging.getLogger(LoggingConstants.SPINE_LOGGER).info
-    if log_type == LoggingConstants.LFR_CRASHDUMP:
-        return logging.getLogger(LoggingConstants.SPINE_LOGGER).crash
+def flush_background_writer():
+    """Block until all log lines queued for the background writer are written"""
+    if _BACKGROUND_WRITER:
+        _BACKGROUND_WRITER.drain()
 
-    return None
+
+def get_background_writer():
+    """The background writer set for log lines, if any"""
+    return _BACKGROUND_WRITER
 
 
 def write_to_file(log_preamble, log_text, substitution_dict, log_type, error_list=None):
     """
     Append the log line to the appropriate file
     Add traceback information if required
+    Kept for compatibility, as log lines are now written by the log engine
+    through its log sink
+    """
+    if _BACKGROUND_WRITER:
+        _BACKGROUND_WRITER.submit(_write_line, log_preamble, log_text, substitution_dict, log_type, error_list)
+    else:
+        _write_line(log_preamble, log_text, substitution_dict, log_type, error_list)
+
+
+def _write_line(log_preamble, log_text, substitution_dict, log_type, error_list):
+    """
+    Render the log line and pass it to the spine logger
     """
     log_line = create_log_line(log_preamble, log_text, substitution_dict)
     if error_list:
         log_line = f"{log_line} - {error_list[0:]}"
 
-    logging_func = _get_logging_function(log_type)
-    if logging_func:
-        # pylint: disable=deprecated-method
-        logging_func(log_line)
+    exc_info = None
+    if log_type == LoggingConstants.LFR_CRASHDUMP and error_list and len(error_list) >= 3:
+        exc_info = tuple(error_list[0:3])
+    PythonLoggingSink().write(log_line, log_type, exc_info)
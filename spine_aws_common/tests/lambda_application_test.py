@@ -8,6 +8,8 @@ from aws_lambda_powertools.utilities.typing.lambda_context import LambdaContext
 
 from spine_aws_common import LambdaApplication
 from spine_aws_common.log.log_helper import LogHelper
+from spine_aws_common.log.sinks import BufferedStdoutSink
+from spine_aws_common.logger import Logger
 
 
 class TestLambdaApplication(TestCase):
@@ -102,3 +104,23 @@ class TestLambdaApplication(TestCase):
         self.app._log_start()
 
         self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "unknown"))
+
+    def test_buffered_logs_flushed_on_exception(self):
+        """Testing that buffered log lines are written when the application fails"""
+
+        class FailingApp(LambdaApplication):
+            """Application which fails with buffered logging"""
+
+            def get_logger(self, additional_log_config=None):
+                return Logger(process_name="failing", log_sink=BufferedStdoutSink())
+
+            def start(self):
+                raise ValueError("boom")
+
+        app = FailingApp()
+        with self.assertRaises(ValueError):
+            app.main(event={}, context=None)
+
+        self.assertTrue(self.log_helper.was_logged("LAMBDA0001"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA9999", "Log_Level", "ERROR"))
+        self.assertTrue(self.log_helper.was_logged("UTI9992"))
@@ -0,0 +1,928 @@
+"""
+Logger Testing
+"""
+from unittest import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+from spine_aws_common.log.background import BackgroundLogWriter
+from spine_aws_common.log.collection import LogCollector
+from spine_aws_common.log.compiledlogbase import (
+    CompiledLogBase,
+    compile_log_base,
+    get_log_base,
+    load_compiled_log_base,
+)
+from spine_aws_common.log.constants import LoggingConstants
+from spine_aws_common.log.crashdumps import cap_traceback
+from spine_aws_common.log.details import LogCatalog, LogDetails, get_log_catalog
+from spine_aws_common.log.engine import LogEngine
+from spine_aws_common.log.formatting import LogTemplate, create_log_line, evaluate_log_keys
+from spine_aws_common.log.log_helper import LogHelper
+from spine_aws_common.log.masking import apply_masking_plan
+from spine_aws_common.log.metrics import LogMetrics
+from spine_aws_common.log.overrides import SeverityOverrides
+from spine_aws_common.log import logbasecompiler, logutil
+from spine_aws_common.log.sinks import (
+    BufferedStdoutSink,
+    ChannelSink,
+    FileSink,
+    HourlyFileSink,
+    MemorySink,
+    PythonLoggingSink,
+)
+from spine_aws_common.log.spinelogging import CRASH, SpineLogger, clean_spine_logging
+from spine_aws_common.log.suppression import LogSuppressor
+from spine_aws_common.log.thirdpartylogging import LoggingAdapter
+from spine_aws_common.log.truncation import cap_fields, cap_text
+from spine_aws_common.log import validation
+from spine_aws_common.log.validation import find_call_sites, validate_call_sites
+from spine_aws_common.logger import Logger, configure_logging_adapter
+
+
+class TestLogCatalog(TestCase):
+    """Testing the precompiled log reference catalog"""
+
+    def setUp(self):
+        self.catalog = LogCatalog(
+            {
+                "UTI9999": ["INFO", "Default text"],
+                "TEST001": ["AUDIT-MONITOR", "Audit and monitor"],
+                "TEST002": ["DEBUG", "Debug text"],
+            }
+        )
+
+    def test_entries_are_shared_and_immutable(self):
+        """The same frozen object is returned for every lookup"""
+        log_details = self.catalog.get("TEST001")
+        self.assertIs(log_details, self.catalog.get("TEST001"))
+        self.assertEqual(log_details.log_value, LoggingConstants.AUDIT)
+        self.assertEqual(log_details.log_level, "AUDIT")
+        self.assertTrue(log_details.monitor_log_required)
+        self.assertTrue(log_details.audit_log_required)
+        with self.assertRaises(AttributeError):
+            log_details.audit_log_required = False
+        with self.assertRaises(AttributeError):
+            log_details.extra = True
+
+    def test_missing_reference_uses_default(self):
+        """Missing references resolve to the UTI9999 entry"""
+        self.assertIs(self.catalog.get("NOTFOUND"), self.catalog.get("UTI9999"))
+
+    def test_severity(self):
+        """Numeric severity checks"""
+        log_details = self.catalog.get("TEST002")
+        self.assertFalse(log_details.is_logged(LoggingConstants.INFO))
+        self.assertTrue(log_details.is_logged(LoggingConstants.DEBUG))
+        self.assertTrue(log_details.check_log_severity_for_log("TRACE", "INFO"))
+        self.assertTrue(LogDetails.is_crashdump_required(LoggingConstants.INFO, ("error",)))
+        self.assertFalse(LogDetails.is_crashdump_required(LoggingConstants.ERROR, ("error",)))
+
+    def test_audit_escalation_is_returned(self):
+        """Sensitive keys escalate to audit without changing the catalog"""
+        self.assertTrue(evaluate_log_keys({"nhsNumber": "9999999999"}))
+        self.assertFalse(evaluate_log_keys({"message": "hello"}))
+        self.assertFalse(self.catalog.get("TEST002").audit_log_required)
+
+    def test_audit_classification(self):
+        """Keys, URLs and nested parameters are classified for PID"""
+        self.assertTrue(evaluate_log_keys({"NHSNUMBER": "9999999999"}))
+        self.assertTrue(evaluate_log_keys({"requestUrl": "/patient?nhsNumber=9999999999"}))
+        self.assertFalse(evaluate_log_keys({"requestUrl": "/patient?family=smith"}))
+        self.assertFalse(evaluate_log_keys({"url": None, "requestUrl": ["not", "a", "url"]}))
+        self.assertTrue(evaluate_log_keys({"parameters": {"givenName": "jo"}}))
+        log_row_dict = {"blank": "  ", "zero": 0}
+        evaluate_log_keys(log_row_dict)
+        self.assertEqual(log_row_dict, {"blank": "NotProvided", "zero": 0})
+
+    def test_compiled_log_base(self):
+        """Compiled log bases match the cfg, and are ignored once stale"""
+        with tempfile.TemporaryDirectory() as directory:
+            log_base = os.path.join(directory, "logbase.cfg")
+            with open(log_base, "w", encoding="utf-8") as log_base_file:
+                log_base_file.write("[TEST001]\nLog Level = INFO\nLog Text = a={a}\nSample Rate = 0.5\n")
+            self.assertEqual(compile_log_base(log_base), log_base + ".compiled")
+
+            compiled = load_compiled_log_base(log_base)
+            self.assertIsInstance(compiled, CompiledLogBase)
+            self.assertEqual(dict(compiled), {"TEST001": ["INFO", "a={a}", {"sample rate": "0.5"}]})
+            self.assertTrue(LogCatalog(compiled).has_limits)
+
+            with open(log_base, "a", encoding="utf-8") as log_base_file:
+                log_base_file.write("\n[TEST002]\nLog Level = INFO\nLog Text = b={b}\n")
+            self.assertIsNone(load_compiled_log_base(log_base))
+            self.assertNotIsInstance(get_log_base(log_base), CompiledLogBase)
+
+            with open(log_base, "a", encoding="utf-8") as log_base_file:
+                log_base_file.write("\n[TEST003]\nLog Level = INFO\nLog Text = c={c\n")
+            self.assertIsNone(compile_log_base([log_base]))
+
+
+class TestLogTemplate(TestCase):
+    """Testing pre-parsed log text templates"""
+
+    def test_matches_str_format(self):
+        """Rendered lines are identical to formatting the raw log text"""
+        substitution_dict = {"a": "x\ny", "b": 1.5, "c": None}
+        for log_text in ["a={a} b={b:.2f} c={c!r}", "no fields", "{a}{{literal}}\n{b}", "{c.__class__}"]:
+            self.assertEqual(
+                create_log_line("pre", LogTemplate(log_text), substitution_dict),
+                create_log_line("pre", log_text, substitution_dict),
+            )
+
+    def test_missing_keys(self):
+        """Missing keys produce the same substitution failure line"""
+        log_template = LogTemplate("a={a} b={b}")
+        self.assertEqual(log_template.field_names, ("a", "b"))
+        self.assertEqual(
+            create_log_line("pre", log_template, {"a": 1}),
+            create_log_line("pre", "a={a} b={b}", {"a": 1}),
+        )
+
+    def test_compile_log_base_and_config(self):
+        """The log base and additional log config are compiled separately, as they are loaded"""
+        with tempfile.TemporaryDirectory() as directory:
+            log_base = os.path.join(directory, "logbase.cfg")
+            with open(log_base, "w", encoding="utf-8") as log_base_file:
+                log_base_file.write("[UTI9999]\nLog Level = INFO\nLog Text = Default\n")
+            log_config = os.path.join(directory, "logconfig.cfg")
+            with open(log_config, "w", encoding="utf-8") as log_config_file:
+                log_config_file.write("[TEST001]\nLog Level = INFO\nLog Text = a={a}\n")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(logbasecompiler.main([log_base, log_config]), 0)
+                self.assertIsInstance(get_log_base(log_base), CompiledLogBase)
+                self.assertIsInstance(get_log_base(log_config), CompiledLogBase)
+                log_catalog = get_log_catalog(log_base, log_config)
+            self.assertNotIn("fail build", output.getvalue())
+            self.assertEqual(log_catalog.get("TEST001").log_text, "a={a}")
+
+    def test_validate_call_sites(self):
+        """Template fields are compared against the keys at call sites"""
+        catalog = LogCatalog({"UTI9999": ["INFO", "Default"], "TEST001": ["INFO", "a={a} b={b}"]})
+        with tempfile.NamedTemporaryFile("w", suffix=".py") as source_file:
+            source_file.write(
+                "def handler(log_object):\n"
+                "    log_object.write_log('TEST001', None, {'a': 1, 'b': 2})\n"
+                "    log_params = {'a': 1, 'c': 3}\n"
+                "    log_object.write_log('TEST001', None, log_params)\n"
+                "    log_object.write_log('TEST404', None, {'a': 1})\n"
+            )
+            source_file.flush()
+            mismatches = validate_call_sites(catalog, find_call_sites([source_file.name]))
+
+        self.assertEqual(len(mismatches), 2)
+        self.assertEqual(mismatches[0].call_site.line, 4)
+        self.assertEqual(mismatches[0].missing_keys, ["b"])
+        self.assertEqual(mismatches[0].unused_keys, ["c"])
+        self.assertFalse(mismatches[0].unknown_reference)
+        self.assertEqual(mismatches[1].call_site.line, 5)
+        self.assertEqual(mismatches[1].call_site.log_reference, "TEST404")
+        self.assertTrue(mismatches[1].unknown_reference)
+
+    def test_validation_main(self):
+        """The command line validation fails when a call site doesn't match its template"""
+        with tempfile.TemporaryDirectory() as directory:
+            log_config = os.path.join(directory, "logbase.cfg")
+            with open(log_config, "w", encoding="utf-8") as log_config_file:
+                log_config_file.write("[TEST001]\nLog Level = INFO\nLog Text = a={a}\n")
+            source = os.path.join(directory, "handler.py")
+            with open(source, "w", encoding="utf-8") as source_file:
+                source_file.write("def handler(log_object):\n    log_object.write_log('TEST001', None, {'a': 1})\n")
+            self.assertEqual(validation.main([source, "--log-config", log_config]), 0)
+
+            with open(source, "a", encoding="utf-8") as source_file:
+                source_file.write("    log_object.write_log('TEST404', None, {'a': 1})\n")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(validation.main([source, "--log-config", log_config]), 1)
+            self.assertIn(f"Unknown log reference - fail build: logReference=TEST404 at {source}:3", output.getvalue())
+
+            with open(source, "a", encoding="utf-8") as source_file:
+                source_file.write("    log_object.write_log('TEST001', None, {'b': 1})\n")
+            self.assertEqual(validation.main([source, "--log-config", log_config]), 1)
+
+
+class TestLogger(TestCase):
+    """Testing the Logger"""
+
+    def setUp(self):
+        self.log_helper = LogHelper()
+        self.log_helper.set_stdout_capture()
+        self.logger = Logger(process_name="test", internal_id="abc")
+
+    def tearDown(self):
+        self.log_helper.clean_up()
+
+    def test_write_log(self):
+        """Log lines are written with substitutions"""
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "req1"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "internalID", "abc"))
+
+    def test_severity_threshold(self):
+        """Logs below the threshold are not written"""
+        self.logger.write_log("UTI9994", None, {"logger": "a", "level": "DEBUG", "message": "b"})
+        self.assertFalse(self.log_helper.was_logged("UTI9994"))
+        self.logger.write_log("UTI9994", None, {"logger": "a", "level": "DEBUG", "message": "b"}, "DEBUG")
+        self.assertTrue(self.log_helper.was_logged("UTI9994"))
+
+    def test_crashdump(self):
+        """Errors with exc info produce a crashdump stub and a crashdump"""
+        try:
+            raise ValueError("boom")
+        except ValueError as err:
+            self.logger.write_log("LAMBDA9999", (type(err), err, err.__traceback__), {"error": "boom"})
+
+        self.assertTrue(self.log_helper.was_value_logged("UTI9992", "originalLogReference", "LAMBDA9999"))
+        self.assertEqual(len(list(self.log_helper.find_log_entries("LAMBDA9999"))), 3)
+
+    def test_buffered_sink(self):
+        """Buffered lines are only written when the buffer fills or is flushed"""
+        logger = Logger(process_name="test", log_sink=BufferedStdoutSink(buffer_size=1000))
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        self.assertFalse(self.log_helper.was_logged("LAMBDA0002"))
+        logger.flush()
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "req1"))
+
+        for _ in range(10):
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": "req2"})
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "req2"))
+
+    def test_background_writer(self):
+        """Lines written on the background writer are all output in order once drained"""
+        logger = Logger(process_name="test", background_writer=BackgroundLogWriter(max_queue_size=5))
+        for index in range(100):
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": index})
+        logger.flush()
+
+        request_ids = [entry["aws_request_id"] for entry in self.log_helper.find_log_entries("LAMBDA0002")]
+        self.assertEqual(request_ids, [str(index) for index in range(100)])
+
+    def test_background_writer_drop_policy(self):
+        """With the drop policy a full queue drops and counts log events"""
+        background_writer = BackgroundLogWriter(max_queue_size=1, full_queue_policy=BackgroundLogWriter.DROP)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block_writer():
+            started.set()
+            release.wait()
+
+        background_writer.submit(block_writer)
+        started.wait()
+        background_writer.submit(print, "queued")
+        background_writer.submit(print, "dropped")
+        self.assertEqual(background_writer.dropped, 1)
+        release.set()
+        background_writer.drain()
+        self.assertEqual(list(self.log_helper.log_lines()), ["queued"])
+
+    def test_background_writer_restarts_dead_thread(self):
+        """A writer whose thread has gone, as in a forked child, starts a new one"""
+        background_writer = BackgroundLogWriter()
+        background_writer.submit(print, "first")
+        background_writer.drain()
+        dead_thread = threading.Thread(target=lambda: None)
+        dead_thread.start()
+        dead_thread.join()
+        background_writer._thread = dead_thread  # pylint:disable=protected-access
+
+        background_writer.submit(print, "second")
+        background_writer.drain()
+        self.assertEqual(list(self.log_helper.log_lines()), ["first", "second"])
+
+    def test_json_output(self):
+        """JSON output holds the preamble fields, rendered text and substitutions"""
+        logger = Logger(process_name="test", internal_id="abc", output_format="json")
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1\nreq2"})
+        logger.write_log(
+            "UTI9995", None, {"logger": "a", "level": "INFO", "message": "b", "requestUrl": "/x?nhsNumber=1"}
+        )
+
+        first, second = [json.loads(line) for line in self.log_helper.log_lines()]
+        self.assertEqual(first["Log_Level"], "INFO")
+        self.assertEqual(first["Process"], "test")
+        self.assertEqual(first["internalID"], "abc")
+        self.assertEqual(first["logReference"], "LAMBDA0002")
+        self.assertEqual(first["message"], "Lambda invoked aws_request_id=req1 req2")
+        self.assertEqual(first["fields"]["aws_request_id"], "req1\nreq2")
+        self.assertEqual(second["fields"]["requestUrl"], "/x?nhsNumber=___MASKED___")
+
+    def test_json_output_crashdump(self):
+        """JSON crashdumps hold the traceback"""
+        logger = Logger(process_name="test", output_format="json")
+        try:
+            raise ValueError("boom")
+        except ValueError as err:
+            logger.write_log("LAMBDA9999", (type(err), err, err.__traceback__), {"error": "boom"})
+
+        lines = [json.loads(line) for line in self.log_helper.log_lines()]
+        self.assertEqual([line["logReference"] for line in lines], ["LAMBDA9999", "UTI9992", "LAMBDA9999"])
+        self.assertIn("ValueError: boom", lines[2]["exception"])
+
+    def test_json_output_circular_value(self):
+        """A value referring to itself is written in its string form rather than failing"""
+        logger = Logger(process_name="test", output_format="json")
+        circular = []
+        circular.append(circular)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": circular})
+
+        (line,) = [json.loads(line) for line in self.log_helper.log_lines()]
+        self.assertEqual(line["logReference"], "LAMBDA0002")
+        self.assertIn("[[...]]", line["fields"])
+
+    def test_is_enabled(self):
+        """Severity can be checked before building log parameters"""
+        self.assertTrue(self.logger.is_enabled("LAMBDA0002"))
+        self.assertFalse(self.logger.is_enabled("UTI9994"))
+        self.assertTrue(self.logger.is_enabled("UTI9994", "DEBUG"))
+
+    def test_lazy_values(self):
+        """Callable values are only evaluated when the log is written"""
+        evaluated = []
+
+        def expensive():
+            evaluated.append(True)
+            return "computed"
+
+        self.logger.write_log("UTI9994", None, {"logger": "a", "level": "DEBUG", "message": expensive})
+        self.assertEqual(evaluated, [])
+
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": expensive})
+        self.assertEqual(evaluated, [True])
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "computed"))
+
+    def test_masking_plans(self):
+        """Only template fields named in the masked keys are masked"""
+        catalog = LogCatalog(
+            {"TEST001": ["INFO", "url={url} other={other}"], "TEST002": ["INFO", "no url"]}, masked_keys=["other"]
+        )
+        log_details = catalog.get("TEST001")
+        self.assertEqual([key for key, _ in log_details.masking_plan], ["url", "other"])
+        masked = apply_masking_plan(log_details.masking_plan, {"url": "/?nhsNumber=1", "other": "/?surname=a"})
+        self.assertEqual(masked, {"url": "/?nhsNumber=___MASKED___", "other": "/?surname=___MASKED___"})
+
+        log_row_dict = {"url": "/?nhsNumber=1"}
+        self.assertEqual(catalog.get("TEST002").masking_plan, ())
+        self.assertIs(apply_masking_plan(catalog.get("TEST002").masking_plan, log_row_dict), log_row_dict)
+
+    def test_masked_keys(self):
+        """Additional masked keys are masked in the written log"""
+        logger = Logger(process_name="test", masked_keys={"message": lambda value: "hidden"})
+        logger.write_log("UTI9995", None, {"logger": "a", "level": "INFO", "message": "secret"})
+        self.assertIn("reports INFO 'hidden'", next(self.log_helper.log_lines()))
+
+    def test_preamble_cache_invalidation(self):
+        """Cached preambles follow changes to the internal ID and process name"""
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        self.logger.set_internal_id("def")
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": "req2"})
+        self.logger.set_process_name("other")
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": "req3"})
+        self.logger.internal_id = None
+        self.logger.write_log("LAMBDA0002", None, {"aws_request_id": "req4"}, process_name="override")
+
+        entries = list(self.log_helper.find_log_entries("LAMBDA0002"))
+        self.assertEqual([entry.get("internalID") for entry in entries], ["abc", "def", "def", None])
+        self.assertEqual([entry["Process"] for entry in entries], ["test", "test", "other", "override"])
+        self.assertRegex(next(self.log_helper.log_lines()), r"^\d\d/\d\d/\d{4} \d\d:\d\d:\d\d\.\d{3} Log_Level=INFO ")
+
+    def _limited_logger(self, **kwargs):
+        """Logger with sampled and rate limited references and a fixed clock"""
+        with tempfile.NamedTemporaryFile("w", suffix=".cfg", delete=False) as log_base_file:
+            log_base_file.write(
+                "[TEST001]\nLog Level = INFO\nLog Text = Limited value={value}\nRate Limit = 1\nRate Burst = 2\n\n"
+                "[TEST002]\nLog Level = INFO\nLog Text = Never sampled value={value}\nSample Rate = 0\n\n"
+                "[TEST003]\nLog Level = AUDIT\nLog Text = Audit value={value}\nSample Rate = 0\n"
+            )
+        self.addCleanup(os.remove, log_base_file.name)
+        logger = Logger(process_name="test", additional_log_config=log_base_file.name, **kwargs)
+        # pylint:disable=protected-access
+        logger._suppressor._clock = lambda: 0.0
+        return logger
+
+    def test_no_suppression_by_default(self):
+        """Without limits configured nothing is checked or summarised"""
+        # pylint:disable=protected-access
+        self.assertIsNone(self.logger._suppressor)
+        self.logger.write_suppression_summary()
+        self.assertEqual(list(self.log_helper.log_lines()), [])
+
+    def test_sampling_and_rate_limits(self):
+        """Limited references are suppressed and summarised, audit lines never are"""
+        logger = self._limited_logger()
+        for value in range(5):
+            logger.write_log("TEST001", None, {"value": value})
+            logger.write_log("TEST002", None, {"value": value})
+            logger.write_log("TEST003", None, {"value": value})
+        logger.write_suppression_summary()
+
+        self.assertEqual(len(list(self.log_helper.find_log_entries("TEST001"))), 2)
+        self.assertEqual(len(list(self.log_helper.find_log_entries("TEST002"))), 0)
+        self.assertEqual(len(list(self.log_helper.find_log_entries("TEST003"))), 5)
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0004", "suppressed_lines", "8"))
+        self.assertTrue(
+            self.log_helper.was_value_logged("LAMBDA0004", "suppressed_references", '"TEST001:3,TEST002:5"')
+        )
+
+        # Counts start again for the next invocation
+        logger.write_suppression_summary()
+        self.assertEqual(len(list(self.log_helper.find_log_entries("LAMBDA0004"))), 1)
+
+    def test_byte_budget(self):
+        """Once the budget is spent only protected lines are written"""
+        logger = Logger(process_name="test", invocation_byte_budget=1)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req2"})
+        logger.write_log("LAMBDA9999", [ValueError, ValueError("boom"), None], {"error": "boom"})
+        logger.write_suppression_summary()
+
+        self.assertEqual(len(list(self.log_helper.find_log_entries("LAMBDA0002"))), 1)
+        self.assertTrue(self.log_helper.was_logged("LAMBDA9999"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0004", "suppressed_references", '"LAMBDA0002:1"'))
+
+    def test_byte_budget_counts_utf8_bytes(self):
+        """The byte budget counts the UTF-8 bytes of each line and its newline"""
+        suppressor = LogSuppressor(byte_budget=10)
+        suppressor.record_bytes("abc")
+        suppressor.record_bytes("caf\u00e9 \u20ac")
+        self.assertEqual(suppressor.bytes_written, 4 + 10)
+
+    def test_aggregated_references(self):
+        """Identical lines are written once at the end of the invocation with a count"""
+        logger = Logger(process_name="test", aggregated_references=["UTI9996"])
+        for _ in range(3):
+            logger.write_log("UTI9996", None, {"logger": "a", "level": "WARN", "message": "repeated"})
+        logger.write_log("UTI9996", None, {"logger": "a", "level": "WARN", "message": "once"})
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        self.assertFalse(self.log_helper.was_logged("UTI9996"))
+
+        logger.write_aggregated_logs()
+        lines = list(self.log_helper.log_lines(lambda line: "logReference=UTI9996" in line))
+        self.assertEqual(len(lines), 2)
+        self.assertIn("'repeated' occurrences=3 firstLogged=", lines[0])
+        self.assertTrue(lines[1].endswith("'once'"))
+
+        logger.write_aggregated_logs()
+        self.assertEqual(len(list(self.log_helper.find_log_entries("UTI9996"))), 2)
+
+    def test_aggregated_references_bound(self):
+        """The same line for each record of a batch is aggregated, written with the first internalID"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink, aggregated_references=["UTI9996"])
+        for record in range(5):
+            with logger.bind(internalID=f"rec{record}"):
+                logger.write_log("UTI9996", None, {"logger": "a", "level": "WARN", "message": "repeated"})
+        self.assertEqual(memory_sink.lines, [])
+
+        logger.write_aggregated_logs()
+        self.assertEqual(len(memory_sink.lines), 1)
+        self.assertIn("internalID=rec0 logReference=UTI9996", memory_sink.lines[0][1])
+        self.assertIn("'repeated' occurrences=5 firstLogged=", memory_sink.lines[0][1])
+
+    def test_metrics(self):
+        """Logging metrics are written as extra fields and then start afresh"""
+        logger = Logger(process_name="test", collect_metrics=True)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        logger.write_log("UTI9994", None, {"logger": "a", "level": "DEBUG", "message": "hidden"})
+        logger.write_log("LAMBDA9999", [ValueError, ValueError("boom"), None], {"error": "boom"})
+        logger.write_log_with_metrics("LAMBDA0003", None, {"duration": 1, "aws_request_id": "req1"})
+
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "duration", "1"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "log_lines_operations", "3"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "log_lines_crashdump", "2"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "log_lines_below_threshold", "1"))
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "log_lines_audit", "0"))
+
+        logger.write_log_with_metrics("LAMBDA0003", None, {"duration": 2, "aws_request_id": "req2"})
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0003", "log_lines_operations", "1"))
+
+    def test_metrics_count_utf8_bytes(self):
+        """The bytes written are the UTF-8 bytes of each line and its newline"""
+        metrics = LogMetrics()
+        metrics.record_write(LoggingConstants.LFR_OPERATIONS, ["abc", "caf\u00e9 \u20ac"], 0.0, 0.0)
+        self.assertEqual(metrics.report()["log_bytes_written"], 4 + 10)
+
+    def test_metrics_severity_overrides(self):
+        """The metrics line honours runtime severity overrides as other lines do"""
+        memory_sink = MemorySink()
+        overrides = {"logReferences": {"LAMBDA0002": "INFO", "LAMBDA0003": "INFO"}}
+        logger = Logger(
+            process_name="test",
+            severity_threshold="ERROR",
+            log_sink=memory_sink,
+            collect_metrics=True,
+            severity_overrides=SeverityOverrides(lambda: overrides),
+        )
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        logger.write_log_with_metrics("LAMBDA0003", None, {"duration": 1, "aws_request_id": "req1"})
+        self.assertEqual(len(memory_sink.lines), 2)
+        self.assertIn("logReference=LAMBDA0003", memory_sink.lines[1][1])
+
+    def test_logging_adapter(self):
+        """Records below the threshold are dropped before their message is formatted"""
+        adapter = LoggingAdapter(self.logger)
+
+        class Unformattable:
+            """Fails the test if the message is formatted"""
+
+            def __str__(self):
+                raise AssertionError("message formatted")
+
+        adapter.emit(logging.LogRecord("botocore", logging.DEBUG, "", 0, Unformattable(), None, None))
+        adapter.emit(logging.LogRecord("tornado.access", logging.INFO, "", 0, Unformattable(), None, None))
+        adapter.emit(logging.LogRecord("botocore", logging.INFO, "", 0, "sent %s", ("/?nhsNumber=1",), None))
+        adapter.emit(
+            logging.LogRecord("pika.channel", logging.WARNING, "", 0, "Channel in exclusive use", None, None)
+        )
+
+        lines = list(self.log_helper.log_lines())
+        self.assertEqual(len(lines), 2)
+        self.assertIn("logReference=UTI9995 - Python logger 'botocore' reports INFO 'sent /?nhsNumber=___", lines[0])
+        self.assertIn("reports INFO 'Connection blocked due to exclusive use'", lines[1])
+
+    def test_library_levels(self):
+        """Library levels and line limits are applied through the Python logger levels"""
+        root_logger = logging.getLogger()
+        self.addCleanup(setattr, root_logger, "handlers", list(root_logger.handlers))
+        self.addCleanup(logging.getLogger("testlibrary").setLevel, logging.NOTSET)
+        adapter = configure_logging_adapter(self.logger, {"testlibrary": ("WARN", 2)})
+        library_logger = logging.getLogger("testlibrary.client")
+
+        self.assertFalse(library_logger.isEnabledFor(logging.INFO))
+        for _ in range(3):
+            library_logger.warning("retrying")
+        self.assertFalse(library_logger.isEnabledFor(logging.CRITICAL))
+        self.assertEqual(len(list(self.log_helper.find_log_entries("UTI9996"))), 2)
+
+        adapter.reset_library_levels()
+        library_logger.warning("retrying")
+        self.assertEqual(len(list(self.log_helper.find_log_entries("UTI9996"))), 3)
+
+    def test_sinks(self):
+        """Lines are passed to the log sink by channel"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1", "nhsNumber": "9999999999"})
+        logger.write_log("LAMBDA9999", [ValueError, ValueError("boom"), None], {"error": "boom"})
+        self.assertEqual(len(memory_sink.lines_for(LoggingConstants.LFR_AUDIT)), 1)
+        self.assertEqual(len(memory_sink.lines_for(LoggingConstants.LFR_OPERATIONS)), 2)
+        self.assertEqual(len(memory_sink.lines_for(LoggingConstants.LFR_CRASHDUMP)), 2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_sink = FileSink(directory)
+            logger = Logger(process_name="test", log_sink=file_sink)
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+            file_sink.close()
+            with open(os.path.join(directory, "operations.log"), encoding="utf-8") as log_file:
+                self.assertIn("logReference=LAMBDA0002 - Lambda invoked aws_request_id=req1\n", log_file.read())
+
+    def test_logutil_write_log(self):
+        """logutil writes through the same engine to the Spine Python logger"""
+        clean_spine_logging()
+        logging.setLoggerClass(SpineLogger)
+        self.addCleanup(clean_spine_logging)
+        self.addCleanup(logging.setLoggerClass, logging.Logger)
+        spine_logger = logging.getLogger(LoggingConstants.SPINE_LOGGER)
+        spine_logger.log_base_dict = {
+            "UTI9992": ["INFO", "Crashdump originalLogReference={originalLogReference}"],
+            "TEST001": ["ERROR", "Failed error={error}"],
+        }
+        spine_logger.severity_threshold = "INFO"
+        spine_logger.process_name = "test"
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        spine_logger.addHandler(handler)
+        spine_logger.propagate = False
+
+        logutil.write_log("TEST001", None, {"error": "first"})
+        self.assertIs(logutil.get_log_engine(), logutil.get_log_engine())
+        logutil.write_log("TEST001", [ValueError, ValueError("boom"), None], {"error": "second"})
+
+        self.assertEqual(
+            records[0].getMessage(), "Log_Level=ERROR Process=test logReference=TEST001 - Failed error=first"
+        )
+        self.assertEqual([record.levelno for record in records], [logging.INFO, logging.INFO, logging.INFO, CRASH])
+        self.assertIs(records[3].exc_info[0], ValueError)
+
+    def test_hourly_file_sink(self):
+        """Channels are buffered to their own files, rotated on the hour"""
+        now = [time.mktime((2023, 1, 1, 12, 59, 0, 0, 0, -1))]
+        with tempfile.TemporaryDirectory() as directory:
+            file_sink = HourlyFileSink(directory, buffer_size=4096, clock=lambda: now[0])
+            logger = Logger(process_name="test", log_sink=file_sink)
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+            self.assertFalse(os.path.exists(os.path.join(directory, "operations")))
+            now[0] += 120
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": "req2"})
+            file_sink.close()
+
+            with open(os.path.join(directory, "operations", "2023010112.log"), encoding="utf-8") as log_file:
+                self.assertIn("aws_request_id=req1\n", log_file.read())
+            with open(os.path.join(directory, "operations", "2023010113.log"), encoding="utf-8") as log_file:
+                self.assertIn("aws_request_id=req2\n", log_file.read())
+
+    def test_log_collector(self):
+        """Lines logged in a child process are written by the parent on their channels"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", internal_id="parent123", log_sink=memory_sink)
+        collector = LogCollector(logger)
+        child = multiprocessing.Process(
+            target=_log_in_child, args=(collector.child_logger_settings(), collector.task_log_fields())
+        )
+        child.start()
+        child.join()
+        self.assertEqual(memory_sink.lines, [])
+
+        collector.collect()
+        operations = memory_sink.lines_for(LoggingConstants.LFR_OPERATIONS)
+        self.assertEqual(len(operations), 3)
+        self.assertIn("Process=test internalID=parent123 logReference=LAMBDA0002", operations[0])
+        self.assertIn("logReference=UTI9992 - ", operations[2])
+        crashdump = memory_sink.lines_for(LoggingConstants.LFR_CRASHDUMP)
+        self.assertEqual(len(crashdump), 2)
+        self.assertIn("Traceback", crashdump[1])
+
+    def test_crashdump_deduplication(self):
+        """Repeats of a crashdump in an invocation refer back to the first, with counts"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink, deduplicate_crashdumps=True)
+        for _ in range(3):
+            try:
+                raise ValueError("boom")
+            except ValueError as err:
+                logger.write_log("LAMBDA9999", sys.exc_info(), {"error": str(err)})
+        crashdump = memory_sink.lines_for(LoggingConstants.LFR_CRASHDUMP)
+        self.assertIn("Traceback", crashdump[1])
+        fingerprint = crashdump[1].rsplit("crashdumpFingerprint=", 1)[1]
+        self.assertTrue(crashdump[5].endswith(f"Repeated crashdump crashdumpFingerprint={fingerprint} occurrences=3"))
+
+        logger.reset_crashdump_fingerprints()
+        try:
+            raise ValueError("boom")
+        except ValueError as err:
+            logger.write_log("LAMBDA9999", sys.exc_info(), {"error": str(err)})
+        self.assertIn("Traceback", memory_sink.lines_for(LoggingConstants.LFR_CRASHDUMP)[7])
+
+    def test_traceback_cap(self):
+        """Long tracebacks keep their end, marked with the original length"""
+        self.assertEqual(cap_traceback("a" * 10 + "b" * 5, 5), "... traceback truncated originalLength=15 ... bbbbb")
+        self.assertEqual(cap_traceback("abc", 5), "abc")
+
+    def test_severity_overrides(self):
+        """Reference and process thresholds are loaded at runtime and refreshed on a TTL"""
+        overrides = {"logReferences": {"TESTDEBUG": "DEBUG"}, "processes": {}}
+        now = [0]
+        severity_overrides = SeverityOverrides(lambda: overrides, ttl=60, clock=lambda: now[0])
+        memory_sink = MemorySink()
+        logger = LogEngine(
+            LogCatalog({"TESTDEBUG": ["DEBUG", "Debug"], "TESTDEBUG2": ["DEBUG", "Debug"]}),
+            process_name="test",
+            log_sink=memory_sink,
+            severity_overrides=severity_overrides,
+        )
+        logger.write_log("TESTDEBUG")
+        logger.write_log("TESTDEBUG2")
+        self.assertEqual(len(memory_sink.lines), 1)
+        self.assertTrue(logger.is_enabled("TESTDEBUG"))
+
+        overrides = {"processes": {"test": "DEBUG", "other": "LOUD"}}
+        logger.refresh_severity_overrides()
+        logger.write_log("TESTDEBUG2")
+        self.assertEqual(len(memory_sink.lines), 1)
+
+        now[0] = 60
+        logger.refresh_severity_overrides()
+        logger.write_log("TESTDEBUG2")
+        logger.write_log("TESTDEBUG2", process_name="another")
+        self.assertEqual(len(memory_sink.lines), 2)
+
+        overrides = {}
+        now[0] = 120
+        logger.refresh_severity_overrides()
+        self.assertIsNone(logger._severity_overrides)  # pylint:disable=protected-access
+
+    def test_bind(self):
+        """Bound fields are carried in the current context rather than set on the logger"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", internal_id="invocation1", log_sink=memory_sink)
+        bound_logger = logger.bind(internalID="record1", aws_request_id="req1")
+        bound_logger.write_log("LAMBDA0002")
+        bound_logger.bind(internalID="record2").write_log("LAMBDA0002", None, {"aws_request_id": "req2"})
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req3"})
+        with bound_logger:
+            logger.write_log("LAMBDA0002")
+            self.assertEqual(logger.current_internal_id(), "record1")
+
+        lines = memory_sink.lines_for(LoggingConstants.LFR_OPERATIONS)
+        self.assertIn("internalID=record1 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req1", lines[0])
+        self.assertIn("internalID=record2 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req2", lines[1])
+        self.assertIn("internalID=invocation1 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req3", lines[2])
+        self.assertIn("internalID=record1 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req1", lines[3])
+        self.assertEqual(logger.internal_id, "invocation1")
+
+        def write_in_thread(internal_id):
+            with logger.bind(internalID=internal_id, aws_request_id=internal_id):
+                barrier.wait()
+                logger.write_log("LAMBDA0002")
+
+        barrier = threading.Barrier(2)
+        threads = [threading.Thread(target=write_in_thread, args=(f"thread{number}",)) for number in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for line in memory_sink.lines_for(LoggingConstants.LFR_OPERATIONS)[4:]:
+            internal_id = line.split("internalID=")[1].split(" ")[0]
+            self.assertTrue(line.endswith(f"aws_request_id={internal_id}"))
+
+    def test_bind_entered_by_overlapping_tasks(self):
+        """One bound logger can be entered by asyncio tasks whose blocks end out of order"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink)
+        bound_logger = logger.bind(internalID="record1")
+
+        async def write_bound(started, finish):
+            with bound_logger:
+                started.set()
+                await finish.wait()
+                logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+
+        async def overlap():
+            first_started, second_started = asyncio.Event(), asyncio.Event()
+            first_finish, second_finish = asyncio.Event(), asyncio.Event()
+            first = asyncio.ensure_future(write_bound(first_started, first_finish))
+            await first_started.wait()
+            second = asyncio.ensure_future(write_bound(second_started, second_finish))
+            await second_started.wait()
+            first_finish.set()
+            await first
+            second_finish.set()
+            await second
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(overlap())
+        finally:
+            loop.close()
+        self.assertEqual(len(memory_sink.lines), 2)
+        for _, line in memory_sink.lines:
+            self.assertIn("internalID=record1 logReference=LAMBDA0002", line)
+        self.assertIsNone(logger.current_internal_id())
+
+    def test_bind_lazy_internal_id(self):
+        """A lazily given internalID is written as its value"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink)
+        logger.bind(internalID=lambda: "record1").write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        self.assertIn("internalID=record1 logReference=LAMBDA0002", memory_sink.lines[0][1])
+
+    def test_channel_sink(self):
+        """Each channel is written to its own destination"""
+        audit_queue = queue.Queue()
+        memory_sink = MemorySink()
+        with tempfile.TemporaryDirectory() as directory:
+            crashdump_path = os.path.join(directory, "crashdump.log")
+            channel_sink = ChannelSink(
+                {LoggingConstants.LFR_AUDIT: audit_queue, LoggingConstants.LFR_CRASHDUMP: crashdump_path},
+                default_sink=memory_sink,
+            )
+            logger = Logger(process_name="test", log_sink=channel_sink)
+            logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1", "nhsNumber": "9999999999"})
+            logger.write_log("LAMBDA9999", [ValueError, ValueError("boom"), None], {"error": "boom"})
+            channel_sink.close()
+
+            self.assertIn("logReference=LAMBDA0002", audit_queue.get_nowait())
+            self.assertTrue(audit_queue.empty())
+            self.assertEqual([log_type for log_type, _ in memory_sink.lines], [LoggingConstants.LFR_OPERATIONS] * 2)
+            with open(crashdump_path, encoding="utf-8") as log_file:
+                self.assertEqual(len(log_file.read().splitlines()), 2)
+
+        self.assertFalse(ChannelSink({}).formats_exceptions)
+        python_logging_sink = PythonLoggingSink(SpineLogger("test"))
+        self.assertTrue(ChannelSink({LoggingConstants.LFR_CRASHDUMP: python_logging_sink}).formats_exceptions)
+        with self.assertRaises(ValueError):
+            ChannelSink({LoggingConstants.LFR_AUDIT: 1.5})
+
+    def test_size_caps(self):
+        """Oversized substitutions and lines are cut, marked with their original length"""
+        self.assertEqual(cap_text("a" * 40, 33), "a" * 2 + "... truncated originalLength=40")
+        self.assertEqual(cap_text("\u00e9" * 40, 34), "\u00e9" * 1 + "... truncated originalLength=40")
+        self.assertEqual(cap_text("\u00e9" * 10, 20), "\u00e9" * 10)
+        log_row_dict = {"body": "x" * 100, "count": 5}
+        self.assertIs(cap_fields(log_row_dict, 400), log_row_dict)
+        self.assertEqual(cap_fields(log_row_dict, 50)["body"], "x" * 18 + "... truncated originalLength=100")
+
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink, max_field_bytes=50)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "x" * 100})
+        self.assertTrue(memory_sink.lines[0][1].endswith("x" * 18 + "... truncated originalLength=100"))
+        logger = Logger(process_name="test", log_sink=memory_sink, max_line_bytes=120)
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "x" * 40})
+        self.assertEqual(len(memory_sink.lines[1][1]), 120)
+        self.assertIn("... truncated originalLength=", memory_sink.lines[1][1])
+
+    def test_write_logs(self):
+        """Rows written together give the same lines as writing each"""
+        rows = [
+            {"aws_request_id": "req1"},
+            {"aws_request_id": "req2", "nhsNumber": "9999999999"},
+            {"aws_request_id": lambda: "req3"},
+            None,
+        ]
+        individual_sink = MemorySink()
+        logger = Logger(process_name="test", internal_id="id1", log_sink=individual_sink)
+        for row in rows:
+            logger.write_log("LAMBDA0002", None, dict(row) if row else None)
+        batch_sink = MemorySink()
+        logger = Logger(process_name="test", internal_id="id1", log_sink=batch_sink)
+        logger.write_logs("LAMBDA0002", [dict(row) if row else None for row in rows])
+
+        def strip_timestamps(lines):
+            return [(log_type, log_line.split(" ", 2)[2]) for log_type, log_line in lines]
+
+        self.assertEqual(len(batch_sink.lines), 4)
+        self.assertEqual(strip_timestamps(batch_sink.lines), strip_timestamps(individual_sink.lines))
+        self.assertIsNone(logger.write_logs("UTI9994", rows))
+        self.assertEqual(len(batch_sink.lines), 4)
+
+        Logger(process_name="test").write_logs("LAMBDA0002", [{"aws_request_id": "req1"}, {"aws_request_id": "req2"}])
+        self.assertTrue(self.log_helper.was_value_logged("LAMBDA0002", "aws_request_id", "req2"))
+
+    def test_substitution_failure_masks_pid(self):
+        """When substitution fails the whole dictionary is output, so every masked key is masked"""
+        memory_sink = MemorySink()
+        logger = LogEngine(LogCatalog({"TEST001": ["INFO", "Missing {other}"]}), log_sink=memory_sink)
+        logger.write_log("TEST001", None, {"url": "http://x/?nhsNumber=9999999999"})
+        self.assertIn("No substitution due to KeyError", memory_sink.lines[0][1])
+        self.assertNotIn("9999999999", memory_sink.lines[0][1])
+        self.assertIn("nhsNumber=___MASKED___", memory_sink.lines[0][1])
+        self.assertFalse(any("9999999999" in line for line in self.log_helper.log_lines()))
+
+    def test_write_logs_bound(self):
+        """Rows written together through a bound logger carry the bound fields"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", internal_id="inv", log_sink=memory_sink)
+        bound_logger = logger.bind(internalID="rec1", aws_request_id="req1")
+        bound_logger.write_log("LAMBDA0002")
+        bound_logger.write_logs("LAMBDA0002", [{}, {"aws_request_id": "req2"}])
+        lines = [log_line.split(" ", 2)[2] for _, log_line in memory_sink.lines]
+        self.assertEqual(lines[0], lines[1])
+        self.assertIn("internalID=rec1 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req1", lines[1])
+        self.assertIn("internalID=rec1 logReference=LAMBDA0002 - Lambda invoked aws_request_id=req2", lines[2])
+        self.assertEqual(bound_logger.current_internal_id(), "rec1")
+
+    def test_write_logs_generator(self):
+        """Rows may be given as a generator, including below the severity threshold"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink, collect_metrics=True)
+        self.assertIsNone(logger.write_logs("UTI9994", ({"message": str(row)} for row in range(3))))
+        logger.write_logs("LAMBDA0002", ({"aws_request_id": str(row)} for row in range(3)))
+        self.assertEqual(len(memory_sink.lines), 3)
+        logger.write_log_with_metrics("LAMBDA0003", None, {"duration": 1, "aws_request_id": "req"})
+        self.assertIn("log_lines_below_threshold=3", memory_sink.lines[3][1])
+
+    def test_library_message_masked_before_capping(self):
+        """Third-party messages are masked before they are capped, so a cut identifier isn't left in clear"""
+        memory_sink = MemorySink()
+        logger = Logger(process_name="test", log_sink=memory_sink, max_field_bytes=95)
+        adapter = LoggingAdapter(logger)
+        message = "body " + "x" * 40 + " 'GPPROVIDER_9434765919A12345' " + "y" * 200
+        record = logging.LogRecord("testlibrary", logging.WARNING, "", 0, message, None, None)
+        adapter.emit(record)
+        self.assertIn("truncated originalLength=", memory_sink.lines[0][1])
+        self.assertNotIn("94347", memory_sink.lines[0][1])
+
+    def test_field_masked_before_capping(self):
+        """Substitutions are masked before they are capped, so a cut identifier isn't left in clear"""
+        memory_sink = MemorySink()
+        catalog = LogCatalog({"UTI9999": ["INFO", "Default"], "TEST001": ["INFO", "url={url}"]})
+        logger = LogEngine(catalog, log_sink=memory_sink, max_field_bytes=95)
+        url = "/x " + "x" * 40 + " 'GPPROVIDER_9434765919A12345' " + "y" * 200
+        logger.write_log("TEST001", None, {"url": url})
+        self.assertIn("truncated originalLength=", memory_sink.lines[0][1])
+        self.assertNotIn("94347", memory_sink.lines[0][1])
+
+
+def _log_in_child(logger_settings, task_log_fields):
+    """Log as a child process would for its task, including a crashdump"""
+    logger = Logger(**logger_settings)
+    with logger.bind(**task_log_fields):
+        logger.write_log("LAMBDA0002", None, {"aws_request_id": "req1"})
+        try:
+            raise ValueError("boom")
+        except ValueError as err:
+            logger.write_log("LAMBDA9999", sys.exc_info(), {"error": str(err)})
+    logger.flush()
@@ -0,0 +1,67 @@
+"""
+PID masking Testing
+"""
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from spine_aws_common.log.masking import (
+    GP_PROVIDER_PATTERN,
+    NHS_NUMBER_PATTERN,
+    TICKET_PATTERN,
+    URL_PID_RE_COMPILED,
+    URL_PID_REPL,
+    mask_pid,
+)
+
+
+def regex_mask_pid(val):
+    """Mask PID by matching the patterns in sequence, as the reference output"""
+    match = TICKET_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "/ticket ___TICKET_MASKED___ " + match.group(3)
+    match = GP_PROVIDER_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "'GPPROVIDER___MASKED___'" + match.group(2)
+    match = NHS_NUMBER_PATTERN.match(val)
+    if match:
+        val = match.group(1) + "nhs-number%7C___MASKED___" + match.group(2)
+    return URL_PID_RE_COMPILED.sub(URL_PID_REPL, val)
+
+
+class TestMasking(TestCase):
+    """Testing PID masking"""
+
+    @parameterized.expand(
+        [
+            ("no_pid", "nothing to see here"),
+            ("ticket", "GET /demographicspineapplication/ticket?id=123 HTTP/1.1"),
+            ("ticket_multiline", "a/ticket?id=1 b /ticket c\nsecond line /ticket?id=2"),
+            ("ticket_at_end", "GET /ticket"),
+            ("gp_provider", "Tornado 'GPPROVIDER_123' and 'GPPROVIDER_456' done"),
+            ("gp_provider_unclosed", "'GPPROVIDER_1' 'GPPROVIDER_2 \n'GPPROVIDER_'x"),
+            ("nhs_number", "https://fhir.nhs.uk/Id/nhs-number%7C9999999999\nnhs-number%7C123 x"),
+            ("nhs_number_before_fhir", "nhs-number%7C123 fhir.nhs.uk"),
+            ("url", "/patient?nhsNumber=9999999999&surname=smith&page=2"),
+            ("combined", "/ticket?nhsNumber=1 'GPPROVIDER_1' fhir.nhs.uk nhs-number%7C1&identifier=2"),
+        ]
+    )
+    def test_matches_regex_masking(self, _, val):
+        """Masking gives the same output as the sequence of regular expressions"""
+        self.assertEqual(mask_pid(val), regex_mask_pid(val))
+
+    def test_masks_pid(self):
+        """PID is masked"""
+        self.assertEqual(
+            mask_pid("https://fhir.nhs.uk/Id/nhs-number%7C9999999999 'GPPROVIDER_123'"),
+            "https://fhir.nhs.uk/Id/nhs-number%7C___MASKED___ 'GPPROVIDER___MASKED___'",
+        )
+
+    def test_adversarial_input(self):
+        """Large inputs which backtrack heavily in the regular expressions are handled"""
+        val = "fhir.nhs.uk/Id/nhs-number%7Cunknown " * 500
+        self.assertEqual(mask_pid(val), regex_mask_pid(val))
+
+    def test_non_string(self):
+        """Values which aren't strings are returned unchanged"""
+        self.assertIsNone(mask_pid(None))